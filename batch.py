@@ -0,0 +1,158 @@
+"""
+Batched simulation of many repetitions of the same match, played in lockstep on NumPy arrays.
+
+NumPy is only required when batching is enabled, which is why it's imported lazily.
+"""
+from __future__ import annotations
+
+import random
+from typing import Any, List, Type, Union
+
+from history import History
+from strategy import Strategy
+from constants import OUTCOMES, LETTERS
+from engine import MatchTask, MatchResult, derive_seed, strategy_random
+
+
+class BatchHistory:
+    """
+    The histories of many games played in lockstep, as seen from one player's point of view.
+
+    `own` and `opponent` are 2-D arrays of moves, shaped (games, rounds played so far),
+    so that `history.opponent[:, -1]` gives you the last opponent's move in every game.
+    Both are views into the same arrays the opponent sees, so nothing is ever copied.
+    `len(history)` returns the number of rounds played so far, just like a regular history.
+    """
+    __slots__ = ("_own", "_opponent", "games", "rounds")
+
+    def __init__(self, own: Any, opponent: Any):
+        self._own = own
+        self._opponent = opponent
+        self.games: int = own.shape[0]
+        self.rounds: int = 0
+
+    def __len__(self) -> int:
+        return self.rounds
+
+    @property
+    def own(self) -> Any:
+        return self._own[:, :self.rounds]
+
+    @property
+    def opponent(self) -> Any:
+        return self._opponent[:, :self.rounds]
+
+
+class _ScalarPlayer:
+    """
+    Plays a strategy that doesn't implement `Strategy.play_batch`, one game at a time.
+    """
+    def __init__(self, strat_cls: Type[Strategy], histories: List[History]):
+        self.strats = [strat_cls() for _ in histories]
+        self.histories = histories
+
+    def play_batch(self, history: BatchHistory, rng: Any) -> List[Any]:
+        return [strat.play(h) for strat, h in zip(self.strats, self.histories)]
+
+
+def _validate(np: Any, strat_cls: Type[Strategy], moves: Any, games: int) -> Any:
+    """
+    Turns whatever `play_batch` returned into an array of moves, making sure they're valid.
+    """
+    moves = np.broadcast_to(np.asarray(moves), (games,))
+    if moves.dtype == bool:
+        return moves.astype(np.uint8)
+    if not np.issubdtype(moves.dtype, np.integer):
+        # even if every move is 0 or 1, like 0.0 and 1.0 are
+        raise RuntimeError(
+            f"Strategy {strat_cls.name} returned moves of an invalid type: {moves.dtype}"
+        )
+    if moves.min() < 0 or moves.max() > 1:
+        invalid = next((move for move in moves.tolist() if move not in (0, 1)), None)
+        raise RuntimeError(f"Strategy {strat_cls.name} returned an invalid move: {invalid}")
+    return moves.astype(np.uint8)
+
+
+def run_batch(task: MatchTask) -> List[MatchResult]:
+    """
+    Simulate `task.repetitions` repetitions of the match in lockstep, and total up their scores.
+
+    Strategies implementing `Strategy.play_batch` make their moves for all games at once,
+    while the others fall back to `Strategy.play`, with one instance per game.
+    If the task has a master seed, the batch is reproducible. The instances falling back
+    to `Strategy.play` get the same random number generators they'd get in a regular match,
+    while each of the vectorized strategies gets a NumPy generator of its own.
+    These can't be mirrored, so antithetic repetitions only apply to the former.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        raise RuntimeError("NumPy is required for batched simulation") from None
+    seed = task.seed
+    streams = (task.strat1_cls, task.strat2_cls)
+    if seed is None:
+        rngs = [np.random.default_rng()] * 2
+    else:
+        rngs = [
+            np.random.default_rng(
+                strategy_random(
+                    seed, *streams, task.repetition, side, task.common_random
+                ).getrandbits(64)
+            )
+            for side in (1, 2)
+        ]
+        if task.common_random:
+            random.seed(derive_seed(seed, task.repetition))
+        else:
+            random.seed(derive_seed(seed, *(s.name for s in streams), task.repetition))
+    games = task.repetitions
+    round_len = task.round_len
+    moves1 = np.zeros((games, round_len), dtype=np.uint8)
+    moves2 = np.zeros((games, round_len), dtype=np.uint8)
+    history1 = BatchHistory(moves1, moves2)
+    history2 = BatchHistory(moves2, moves1)
+    players: List[Union[Strategy, _ScalarPlayer]] = []
+    scalar_histories: List[History] = []
+    for side, strat_cls in enumerate((task.strat1_cls, task.strat2_cls), start=1):
+        if strat_cls.vectorized:
+            players.append(strat_cls())
+            continue
+        if not scalar_histories:
+            scalar_histories = [History() for _ in range(games)]
+        histories = scalar_histories
+        if side == 2:
+            histories = [h.mirror() for h in scalar_histories]
+        player = _ScalarPlayer(strat_cls, histories)
+        if seed is not None and strat_cls.stochastic:
+            for game, strat in enumerate(player.strats):
+                strat.random = strategy_random(
+                    seed,
+                    *streams,
+                    task.repetition + game,
+                    side,
+                    task.common_random,
+                    task.antithetic,
+                )
+        players.append(player)
+    player1, player2 = players
+    rng1, rng2 = rngs
+    # simulate
+    for i in range(round_len):
+        result1 = _validate(np, task.strat1_cls, player1.play_batch(history1, rng1), games)
+        result2 = _validate(np, task.strat2_cls, player2.play_batch(history2, rng2), games)
+        moves1[:, i] = result1
+        moves2[:, i] = result2
+        history1.rounds = history2.rounds = i + 1
+        for h, move1, move2 in zip(scalar_histories, result1.tolist(), result2.tolist()):
+            h.record(move1, move2)
+    # total up the scores
+    outcomes = np.array(OUTCOMES)
+    scores1 = outcomes[moves1, moves2].sum(axis=1).tolist()
+    scores2 = outcomes[moves2, moves1].sum(axis=1).tolist()
+    results = [MatchResult(score1, score2, '', '') for score1, score2 in zip(scores1, scores2)]
+    if task.renders(task.repetition):
+        letters = np.array(LETTERS)
+        results[0] = results[0]._replace(
+            moves1=''.join(letters[moves1[0]]), moves2=''.join(letters[moves2[0]])
+        )
+    return results
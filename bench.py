@@ -0,0 +1,241 @@
+"""
+Benchmarks of the simulation hot paths: `Strategy.play` of every strategy, matches, scoring,
+and how the whole tournament scales with the number of strategies and the round length.
+
+The results are saved into `bench.json`. Once a baseline has been saved, every following run
+is compared against it, and anything that got slower than `tolerance` allows
+is reported as a regression in `bench.txt`. The comparison is relative to a calibration loop,
+timed during each run, so that running on a slower (or busier) machine doesn't count
+as a regression. Each benchmark is timed multiple times and its median is compared,
+and changes too small to tell apart from the noise, like those of sub-microsecond moves,
+are never reported.
+"""
+import json
+import platform
+from statistics import median
+from functools import partial
+from time import perf_counter, perf_counter_ns
+from itertools import combinations
+from random import Random
+from typing import Callable, Dict, List, NamedTuple, Optional, Type
+
+from history import History
+from strategy import Strategy
+from constants import ROUNDS
+from engine import MatchTask, match, fast_match, total, run_matches
+from main import strategies, with_stochastic
+
+
+# Each benchmark is timed this many times, and the median time is kept
+repeat: int = 5
+# The round lengths `Strategy.play` latency and tournament scaling are measured at.
+# Strategies whose latency grows with the round length are scanning the history.
+round_lengths: List[int] = [100, 1000, 10000]
+# The round length matches and scoring are measured at
+match_len: int = 1000
+# The numbers of strategies tournament scaling is measured at
+strategy_counts: List[int] = [5, 10, 20]
+# The seed used for the opponents' moves and the stochastic strategies, so that every run
+# benchmarks the exact same matches
+seed: int = 0
+# The file the baseline is kept in
+baseline_file: str = "bench_baseline.json"
+# Set this to save the results of this run as the new baseline
+save_baseline: bool = False
+# How much slower than the baseline a benchmark can get, before it's reported as a regression
+tolerance: float = 0.3
+# How much slower than the baseline a benchmark has to get in absolute terms too, by its unit,
+# before it's reported as a regression, as timing single moves varies a lot between runs
+noise_floor: Dict[str, float] = {"us/move": 0.5, "s": 0.01}
+
+
+class Metric(NamedTuple):
+    value: float
+    unit: str
+    higher_is_better: bool = False
+
+
+def median_of(benchmark: Callable[[], float]) -> float:
+    """
+    Returns the median of `repeat` runs of the benchmark, which returns the time it took.
+    """
+    return median(benchmark() for _ in range(repeat))
+
+
+def calibration() -> float:
+    """
+    Returns the time a fixed, pure Python loop takes, in seconds.
+    """
+    def benchmark() -> float:
+        start = perf_counter()
+        history = History()
+        for i in range(100000):
+            history.record(i & 1, i >> 1 & 1)
+            history[-1]
+        return perf_counter() - start
+    return min(median_of(benchmark) for _ in range(5))
+
+
+def play_latency(strat_cls: Type[Strategy], round_len: int) -> float:
+    """
+    Returns the average time a single `Strategy.play` call takes, in microseconds,
+    over a match of the given length, against an opponent playing random moves.
+    """
+    def benchmark() -> float:
+        rng = Random(seed)
+        opponent_moves = [rng.randint(0, 1) for _ in range(round_len)]
+        strat = strat_cls()
+        strat.random = Random(seed)
+        history = History()
+        elapsed = 0
+        for opponent_move in opponent_moves:
+            start = perf_counter_ns()
+            move = strat.play(history)
+            elapsed += perf_counter_ns() - start
+            history.record(int(move), opponent_move)
+        return elapsed / round_len / 1000
+    return median_of(benchmark)
+
+
+def match_throughput(
+    strategies: List[Type[Strategy]],
+    simulate: Callable[[Type[Strategy], Type[Strategy], int], object],
+) -> float:
+    """
+    Returns the number of rounds simulated per second, playing a round-robin
+    of single matches between the given strategies.
+    """
+    pairs = list(combinations(strategies, 2))
+
+    def benchmark() -> float:
+        start = perf_counter()
+        for strat1_cls, strat2_cls in pairs:
+            simulate(strat1_cls, strat2_cls, match_len)
+        return perf_counter() - start
+    return len(pairs) * match_len / median_of(benchmark)
+
+
+def scoring_throughput(strategies: List[Type[Strategy]]) -> float:
+    """
+    Returns the number of rounds scored per second, totaling up a round-robin of match histories.
+    """
+    histories = [match(s1, s2, match_len, seed) for s1, s2 in combinations(strategies, 2)]
+
+    def benchmark() -> float:
+        start = perf_counter()
+        for history in histories:
+            total(history)
+        return perf_counter() - start
+    return len(histories) * match_len / median_of(benchmark)
+
+
+def tournament_time(strategies: List[Type[Strategy]], round_len: int) -> float:
+    """
+    Returns the time a serial, uncached tournament between the given strategies takes, in seconds.
+    """
+    tasks = [
+        MatchTask(strat1_cls, strat2_cls, round_len, round, seed=seed)
+        for strat1_cls, strat2_cls in combinations(strategies, 2)
+        for round in range(ROUNDS if strat1_cls.stochastic or strat2_cls.stochastic else 1)
+    ]
+
+    def benchmark() -> float:
+        start = perf_counter()
+        for task in tasks:
+            run_matches(task)
+        return perf_counter() - start
+    return median_of(benchmark)
+
+
+def run(strategies: List[Type[Strategy]]) -> Dict[str, Metric]:
+    """
+    Runs all benchmarks, returning the results keyed by their names.
+    """
+    metrics: Dict[str, Metric] = {}
+    # calibrated both before and after, as the machine may take a while to speed up
+    calibrated = calibration()
+    for strat_cls in strategies:
+        for round_len in round_lengths:
+            metrics[f"play/{strat_cls.name}/{round_len}"] = Metric(
+                play_latency(strat_cls, round_len), "us/move"
+            )
+    metrics["match/simulated"] = Metric(
+        match_throughput(strategies, partial(match, seed=seed)), "rounds/s", True
+    )
+    deterministic = [s for s in strategies if not s.stochastic]
+    metrics["match/fast_forward"] = Metric(
+        match_throughput(deterministic, fast_match), "rounds/s", True
+    )
+    metrics["scoring"] = Metric(scoring_throughput(strategies), "rounds/s", True)
+    for count in strategy_counts:
+        if count <= len(strategies):
+            metrics[f"tournament/strategies/{count}"] = Metric(
+                tournament_time(strategies[:count], match_len), "s"
+            )
+    for round_len in round_lengths:
+        metrics[f"tournament/round_len/{round_len}"] = Metric(
+            tournament_time(strategies, round_len), "s"
+        )
+    metrics["calibration"] = Metric(min(calibrated, calibration()), "s")
+    return metrics
+
+
+def regression(metric: Metric, baseline: Metric, speed: float) -> Optional[float]:
+    """
+    Returns how much slower the metric got compared to the baseline, as a fraction,
+    or `None` if it's within the tolerance, or the noise floor of its unit.
+    `speed` is how much faster the machine ran the calibration loop, compared to the baseline run.
+    """
+    if metric.higher_is_better:
+        slowdown = baseline.value * speed / metric.value - 1 if metric.value else float("inf")
+    else:
+        slowdown = metric.value * speed / baseline.value - 1 if baseline.value else 0.0
+        if metric.value * speed - baseline.value < noise_floor.get(metric.unit, 0.0):
+            return None
+    return slowdown if slowdown > tolerance else None
+
+
+if __name__ == "__main__":
+    if not with_stochastic:
+        strategies = [s for s in strategies if not s.stochastic]
+    metrics = run(strategies)
+    results = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "metrics": {key: metric._asdict() for key, metric in metrics.items()},
+    }
+    with open("bench.json", "w", encoding="utf8") as file:
+        json.dump(results, file, indent=4)
+    baseline: Dict[str, Metric] = {}
+    if save_baseline:
+        with open(baseline_file, "w", encoding="utf8") as file:
+            json.dump(results, file, indent=4)
+    else:
+        try:
+            with open(baseline_file, encoding="utf8") as file:
+                baseline = {
+                    key: Metric(**fields) for key, fields in json.load(file)["metrics"].items()
+                }
+        except FileNotFoundError:
+            pass
+    with open("bench.txt", "w", encoding="utf8") as file:
+        nl = max(map(len, metrics)) + 1
+        file.write("BENCHMARKS\n")
+        for key, metric in metrics.items():
+            line = f"{f'{key}:':{nl}} {metric.value:.6g} {metric.unit}"
+            if key in baseline:
+                line += f" (baseline: {baseline[key].value:.6g})"
+            file.write(line + '\n')
+        if baseline:
+            file.write("\n\nREGRESSIONS\n")
+            speed = baseline["calibration"].value / metrics["calibration"].value
+            regressions = 0
+            for key, metric in metrics.items():
+                if key not in baseline or key == "calibration":
+                    continue
+                slowdown = regression(metric, baseline[key], speed)
+                if slowdown is not None:
+                    regressions += 1
+                    file.write(f"{f'{key}:':{nl}} {slowdown:.1%} slower\n")
+            if not regressions:
+                file.write("none\n")
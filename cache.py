@@ -0,0 +1,120 @@
+import sqlite3
+import inspect
+import hashlib
+from functools import lru_cache
+from typing import Optional, Type
+
+import registry
+from strategy import Strategy
+from constants import OUTCOMES
+from engine import MatchTask, MatchResult
+
+
+# bumped whenever the format of the keys changes, so that old results are never served
+CACHE_VERSION = 3
+
+
+def _identity(strat_cls: Type[Strategy]) -> str:
+    return f"{strat_cls.__module__}.{strat_cls.__qualname__}"
+
+
+@lru_cache(maxsize=None)
+def source_hash(strat_cls: Type[Strategy]) -> str:
+    """
+    Returns a hash of the source code of the strategy's whole module, including the source
+    of any strategies it inherits from in other modules, so that editing a helper or a parent
+    strategy invalidates it too. Indexed strategies already have it in the index.
+    """
+    info = registry.indexed(strat_cls)
+    if info is not None:
+        return info.source_hash
+    module = inspect.getmodule(strat_cls)
+    assert module is not None
+    digest = hashlib.sha256(inspect.getsource(module).encode("utf8"))
+    for cls in strat_cls.__mro__:
+        if cls is Strategy:
+            break
+        if cls.__module__ != strat_cls.__module__:
+            digest.update(inspect.getsource(cls).encode("utf8"))
+    return digest.hexdigest()
+
+
+class MatchCache:
+    """
+    A persistent, on-disk cache of deterministic match results.
+
+    Matches between two non-stochastic strategies always end up the same,
+    so their results are keyed by both strategies' source hashes, the round length
+    and the outcomes of the dilemma. Editing a strategy changes its source hash,
+    which means only the matches involving it are simulated again.
+    Stochastic matches are never cached.
+    """
+    # how many results can be stored before they're committed to the disk
+    COMMIT_EVERY = 1000
+
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS matches ("
+            "key TEXT PRIMARY KEY, score1 INTEGER, score2 INTEGER, moves1 TEXT, moves2 TEXT"
+            ")"
+        )
+        self._uncommitted = 0
+
+    def __enter__(self) -> "MatchCache":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    @staticmethod
+    def key(task: MatchTask) -> Optional[str]:
+        """
+        Returns the cache key of the given match, or `None` if the match can't be cached.
+        """
+        if task.repetition != 0 or task.strat1_cls.stochastic or task.strat2_cls.stochastic:
+            return None
+        # strategies from the same module can share their source hash, so they're told apart
+        # by their names too. Results without their moves rendered are kept apart as well,
+        # so that they're never served to a run that writes them.
+        return (
+            f"{CACHE_VERSION}"
+            f":{_identity(task.strat1_cls)}:{source_hash(task.strat1_cls)}"
+            f":{_identity(task.strat2_cls)}:{source_hash(task.strat2_cls)}"
+            f":{task.round_len}:{OUTCOMES}:{int(task.render)}"
+        )
+
+    def get(self, task: MatchTask) -> Optional[MatchResult]:
+        """
+        Returns the cached result of the given match, or `None` if there isn't one.
+        """
+        key = self.key(task)
+        if key is None:
+            return None
+        row = self._db.execute(
+            "SELECT score1, score2, moves1, moves2 FROM matches WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return MatchResult(*row)
+
+    def put(self, task: MatchTask, result: MatchResult) -> None:
+        """
+        Stores the result of the given match, if it can be cached.
+        Forfeited matches depend on how fast the machine is, so they're never stored.
+        """
+        key = self.key(task)
+        if key is None or result.forfeit:
+            return
+        self._db.execute(
+            "INSERT OR REPLACE INTO matches VALUES (?, ?, ?, ?, ?)",
+            (key, result.score1, result.score2, result.moves1, result.moves2),
+        )
+        self._uncommitted += 1
+        if self._uncommitted >= self.COMMIT_EVERY:
+            self._db.commit()
+            self._uncommitted = 0
+
+    def close(self) -> None:
+        self._db.commit()
+        self._db.close()
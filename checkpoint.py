@@ -0,0 +1,69 @@
+"""
+Checkpoints of a tournament in progress, so that an interrupted run can be resumed.
+
+A checkpoint holds everything `main.py` accumulates while writing `results.txt`: the scores,
+the number of pairs already written, and how far into `results.txt` they go. Resuming cuts
+`results.txt` back to that point, and plays the remaining pairs with the same round length
+and seed, so that the results end up identical to those of an uninterrupted run.
+"""
+import os
+import json
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+# bumped whenever the format of the checkpoint changes, so that old ones aren't resumed
+CHECKPOINT_VERSION = 2
+
+
+class Checkpoint(NamedTuple):
+    round_len: int
+    seed: int
+    # the names of all strategies taking part, in order
+    strategies: List[str]
+    # the number of pairs written into `results.txt`, and the size of it after the last one
+    completed: int
+    offset: int
+    scores: Dict[str, float]
+    pair_scores: List[Tuple[str, str, float, float]]
+    disqualified: List[str]
+    times: Dict[str, Tuple[float, int, float]]
+    # the size of the trace file after the last pair, if it's being written
+    trace_offset: int = 0
+
+
+def save(path: str, checkpoint: Checkpoint) -> None:
+    """
+    Saves the checkpoint, replacing the previous one only once it's been fully written,
+    so that being interrupted in the middle of it leaves the previous one intact.
+    """
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf8") as file:
+        json.dump({"version": CHECKPOINT_VERSION, **checkpoint._asdict()}, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+def load(path: str) -> Optional[Checkpoint]:
+    """
+    Returns the checkpoint saved in the given file, or `None` if there isn't one.
+    """
+    try:
+        with open(path, encoding="utf8") as file:
+            data = json.load(file)
+    except FileNotFoundError:
+        return None
+    if data.pop("version", None) != CHECKPOINT_VERSION:
+        raise RuntimeError(f"The checkpoint in {path} was saved by a different version")
+    checkpoint = Checkpoint(**data)
+    # JSON turns the tuples into lists
+    return checkpoint._replace(
+        pair_scores=[
+            (str(name1), str(name2), float(score1), float(score2))
+            for name1, name2, score1, score2 in checkpoint.pair_scores
+        ],
+        times={
+            name: (float(spent), int(moves), float(longest))
+            for name, (spent, moves, longest) in checkpoint.times.items()
+        },
+    )
@@ -0,0 +1,58 @@
+"""
+Pre-flight conformance checks of the strategies.
+
+Every move a strategy makes has to be checked to be a valid one, which takes a good share
+of the time cheap strategies spend playing. Instead, each strategy is played against a battery
+of opponents first, and certified if every one of its moves there was a plain `int` or `bool`,
+either 0 or 1. Matches between two certified strategies then skip checking every move.
+"""
+from random import Random
+from functools import lru_cache
+from typing import Callable, Dict, List, Type
+
+from history import History
+from strategy import Strategy
+
+
+# how many rounds the strategies are played for, against each of the opponents
+BATTERY_LENGTH = 64
+
+# the moves of the opponents, given the round number and the strategy's moves so far
+_rng = Random(0)
+_random_moves = [_rng.randint(0, 1) for _ in range(BATTERY_LENGTH)]
+BATTERY: Dict[str, Callable[[int, List[int]], int]] = {
+    "cooperate": lambda i, moves: 1,
+    "defect": lambda i, moves: 0,
+    "alternate": lambda i, moves: i & 1,
+    "reverse_alternate": lambda i, moves: 1 - (i & 1),
+    "tit_for_tat": lambda i, moves: moves[-1] if moves else 1,
+    "reverse_tit_for_tat": lambda i, moves: 1 - moves[-1] if moves else 0,
+    "random": lambda i, moves: _random_moves[i],
+}
+
+
+@lru_cache(maxsize=None)
+def certified(strat_cls: Type[Strategy]) -> bool:
+    """
+    Returns `True` if the strategy made only valid moves against every opponent of the battery.
+
+    Strategies that raise an error, or return anything else than a plain 0 or 1
+    (like `None`, `1.0`, or a NumPy integer), aren't certified, and have their every move
+    checked, so that they fail the exact same way they always did.
+    """
+    for opponent in BATTERY.values():
+        strat = strat_cls()
+        if strat_cls.stochastic:
+            strat.random = Random(0)
+        history = History()
+        moves: List[int] = []
+        try:
+            for i in range(BATTERY_LENGTH):
+                move = strat.play(history)
+                if type(move) not in (int, bool) or move not in (0, 1):
+                    return False
+                moves.append(int(move))
+                history.record(int(move), opponent(i, moves[:-1]))
+        except Exception:
+            return False
+    return True
@@ -1,4 +1,5 @@
 import random
+from typing import Optional
 
 # Specification of the outcomes of the dilemma.
 # Note: For the dilemma to remain valid, the values given have to meet these conditions:
@@ -16,8 +17,14 @@ LETTERS = ('D', 'C')
 # Note: This applies only to stochastic strategies, ones that utilize the `random` module
 # Strategies not using that module are compared via a single round each.
 ROUNDS = 10
+# The master seed, that the round length and every random move of stochastic strategies
+# is derived from. Set it to the seed written into `results.txt`, to reproduce that run.
+# Use None to draw a new one on every run.
+SEED: Optional[int] = None
+if SEED is None:
+    SEED = random.randrange(2**32)
 # The length of each round. This is random, to prevent strategies from knowing when the round
 # is about to end, and using this information to their advantage.
 # Step of 2 guarantees the length to be even,
 # to give a fair chance for each strategy to retailiate back if needed.
-ROUND_LEN = random.randrange(150, 300, 2)
+ROUND_LEN = random.Random(SEED).randrange(150, 300, 2)
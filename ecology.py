@@ -0,0 +1,90 @@
+"""
+Ecological tournament: which strategies survive in an evolving population?
+
+The pairwise payoff matrix is built once, from a round-robin that includes each strategy
+playing against itself. Every generation, each strategy's share of the population grows
+or shrinks with how well it does against the current population, which only takes a couple
+of matrix operations on the cached payoff matrix - no matches are played anymore.
+Requires NumPy.
+"""
+from itertools import combinations_with_replacement
+from math import floor, log10
+from typing import List, Type
+
+import numpy as np
+
+from strategy import Strategy
+from constants import ROUND_LEN, SEED
+from main import strategies, with_stochastic, play, average
+
+
+# The population model to use:
+# • "discrete" - discrete generations, each strategy's share is multiplied by its fitness,
+#   relative to the average fitness of the population
+# • "replicator" - continuous replicator dynamics, integrated with a step of `step_size`
+model: str = "discrete"
+# The number of generations to simulate
+generations: int = 10000
+# The step size used by the "replicator" model
+step_size: float = 0.01
+# Population shares are recorded every this many generations
+record_every: int = 10
+# Strategies with a population share below this are considered extinct
+extinct_below: float = 1e-6
+
+
+def payoff_matrix(strategies: List[Type[Strategy]]) -> np.ndarray:
+    """
+    Returns the matrix of average per-round scores, where `matrix[i, j]` is the score
+    of the i-th strategy against the j-th one. This includes each strategy playing itself.
+    """
+    index = {strat_cls: i for i, strat_cls in enumerate(strategies)}
+    pairs = list(combinations_with_replacement(strategies, 2))
+    matrix = np.zeros((len(strategies), len(strategies)))
+    for (strat1_cls, strat2_cls), pair_results in zip(pairs, play(pairs)):
+        i, j = index[strat1_cls], index[strat2_cls]
+        matrix[i, j], matrix[j, i] = average(pair_results)
+    return matrix
+
+
+def evolve(matrix: np.ndarray, shares: np.ndarray) -> np.ndarray:
+    """
+    Returns the population shares of the next generation.
+    """
+    fitness = matrix @ shares
+    average_fitness = shares @ fitness
+    if model == "discrete":
+        return shares * fitness / average_fitness
+    elif model == "replicator":
+        shares = np.clip(shares + step_size * shares * (fitness - average_fitness), 0, None)
+        return shares / shares.sum()
+    raise RuntimeError(f"Unknown population model: {model}")
+
+
+if __name__ == "__main__":
+    if not with_stochastic:
+        strategies = [s for s in strategies if not s.stochastic]
+    matrix = payoff_matrix(strategies)
+    shares = np.full(len(strategies), 1 / len(strategies))
+    trajectory = [shares]
+    for generation in range(1, generations + 1):
+        shares = evolve(matrix, shares)
+        if generation % record_every == 0:
+            trajectory.append(shares)
+    # the trajectory of each strategy's population share
+    with open("ecology.csv", "w", encoding="utf8") as file:
+        file.write(','.join(["generation", *(s.name for s in strategies)]) + '\n')
+        for n, recorded in enumerate(trajectory):
+            file.write(','.join([str(n * record_every), *map(str, recorded.tolist())]) + '\n')
+    # the final population
+    with open("ecology.txt", "w", encoding="utf8") as file:
+        file.write(f"Round length: {ROUND_LEN}\n")
+        file.write(f"Seed: {SEED}\n")
+        file.write(f"Model: {model}\n")
+        file.write(f"Generations: {generations}\n\n\n")
+        file.write("FINAL POPULATION SHARES\n")
+        nw = floor(log10(len(strategies))) + 1
+        nl = max(len(s.name) for s in strategies) + 1
+        for i, n in enumerate(np.argsort(-shares, kind="stable"), start=1):
+            status = " (extinct)" if shares[n] < extinct_below else ''
+            file.write(f"#{i:{nw}} {f'{strategies[n].name}:':{nl}} {shares[n]:.6f}{status}\n")
@@ -0,0 +1,738 @@
+import pickle
+import random
+import signal
+import hashlib
+import threading
+from array import array
+from random import Random
+from time import perf_counter
+from functools import lru_cache
+from itertools import accumulate
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Type
+
+from history import History, BoundedHistory
+from strategy import Strategy, FSMStrategy
+from markov import memory_one, expected_scores
+from conformance import certified
+from constants import OUTCOMES, LETTERS, ROUND_LEN
+
+
+class MatchTask(NamedTuple):
+    """
+    A single match to be played, picklable so it can be sent over to a worker process.
+
+    The round length and the master seed are passed explicitly, as worker processes started
+    via `spawn` import `constants` again, drawing their own `SEED` and `ROUND_LEN` values.
+    """
+    strat1_cls: Type[Strategy]
+    strat2_cls: Type[Strategy]
+    round_len: int
+    repetition: int
+    fast_forward: bool = False
+    exact: bool = False
+    # the number of repetitions, starting at `repetition`, to be simulated together in a batch
+    repetitions: int = 1
+    # the master seed the random number generators of this match are derived from
+    seed: Optional[int] = None
+    # variance reduction, see `strategy_random`
+    common_random: bool = False
+    antithetic: bool = False
+    # time every move, see `timed_match`
+    profile: bool = False
+    # time limits in seconds, 0 meaning no limit, see `timed_match`
+    move_time_limit: float = 0.0
+    match_time_limit: float = 0.0
+    # whether the moves of the first repetition are rendered, for `results.txt` or the traces
+    render: bool = True
+
+    def renders(self, repetition: int) -> bool:
+        """
+        Returns `True` if the moves of the given repetition have to be rendered.
+        Only the first repetition ever is, and only if `render` is set.
+        """
+        return self.render and repetition == 0
+
+
+class MatchTiming(NamedTuple):
+    """
+    How long a single match took, in seconds.
+    """
+    # the total time spent in each strategy's `play`, and the longest single move
+    time1: float
+    longest1: float
+    time2: float
+    longest2: float
+    # the number of moves each strategy made
+    moves: int
+    # the wall time of the whole match
+    wall: float
+
+
+class MatchResult(NamedTuple):
+    """
+    The totaled up result of a single match.
+
+    The moves are rendered only for the first repetition of each pair,
+    as they're the only ones written into `results.txt` and the traces,
+    and only if they're written at all, see `MatchTask.render`.
+    Exactly evaluated matches have their expected scores here instead.
+    Timed matches have their timing attached, and `forfeit` set to the side (1 or 2)
+    of the strategy that exceeded a time limit, if any did.
+    """
+    score1: float
+    score2: float
+    moves1: str
+    moves2: str
+    timing: Optional[MatchTiming] = None
+    forfeit: int = 0
+
+
+def derive_seed(seed: int, *keys: Any) -> int:
+    """
+    Derives the seed of an independent random number stream from the master seed,
+    with the keys identifying the stream.
+
+    The keys are hashed together with the master seed, so every stream only depends
+    on what it's used for, and not on how many other streams were derived before it,
+    or in which process.
+    """
+    digest = hashlib.sha256(repr((seed, *keys)).encode()).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+class AntitheticRandom(Random):
+    """
+    The mirror image of a regular `Random` instance seeded the same way.
+
+    `random()` returns `1 - u` (well, the largest float below it) wherever the regular one
+    would return `u`, and random integers in `[0, n)` are mirrored as `n - 1 - i`, so every
+    decision based on them, like `random() < p`, `randint(0, 1)` or `choices()`,
+    goes the other way.
+    """
+    def random(self) -> float:
+        # both are multiples of 2 ** -53, so this is exact, and never reaches 1
+        return (1.0 - 2 ** -53) - super().random()
+
+    def _randbelow(self, n: int) -> int:
+        # every integer method (randint, randrange, shuffle, sample) goes through this one
+        return n - 1 - super()._randbelow(n)  # type: ignore[misc]
+
+
+def strategy_random(
+    seed: int,
+    strat1_cls: Type[Strategy],
+    strat2_cls: Type[Strategy],
+    repetition: int,
+    side: int,
+    common_random: bool = False,
+    antithetic: bool = False,
+) -> Random:
+    """
+    Returns the random number generator of the strategy on the given side (1 or 2)
+    of the given repetition of the match.
+
+    By default, every match gets streams of its own. With `common_random` set, a strategy
+    draws the same random numbers in the same repetition of each of its matches instead,
+    no matter who it plays against, so the differences between the scores come down
+    to the strategies themselves, rather than to luck. With `antithetic` set,
+    every odd repetition mirrors the random numbers of the even one before it.
+    """
+    random_cls = Random
+    if antithetic:
+        repetition, odd = divmod(repetition, 2)
+        if odd:
+            random_cls = AntitheticRandom
+    if common_random:
+        keys: Tuple[Any, ...] = ((strat1_cls if side == 1 else strat2_cls).name, repetition)
+        if strat1_cls is strat2_cls and side == 2:
+            # a strategy playing itself shouldn't end up mirroring its own moves
+            keys += (side,)
+    else:
+        keys = (strat1_cls.name, strat2_cls.name, repetition, side)
+    return random_cls(derive_seed(seed, *keys))
+
+
+def seed_match(
+    strat1: Strategy,
+    strat2: Strategy,
+    seed: int,
+    repetition: int,
+    common_random: bool = False,
+    antithetic: bool = False,
+) -> None:
+    """
+    Gives each stochastic strategy instance its own random number generator,
+    for the given repetition of their match. See `strategy_random` for the details.
+
+    The `random` module itself is seeded too, for the strategies that use it directly.
+    It's shared by both strategies, so it can't be mirrored.
+    """
+    strat1_cls, strat2_cls = type(strat1), type(strat2)
+    if common_random:
+        random.seed(derive_seed(seed, repetition))
+    else:
+        random.seed(derive_seed(seed, strat1_cls.name, strat2_cls.name, repetition))
+    streams = (seed, strat1_cls, strat2_cls, repetition)
+    if strat1_cls.stochastic:
+        strat1.random = strategy_random(*streams, 1, common_random, antithetic)
+    if strat2_cls.stochastic:
+        strat2.random = strategy_random(*streams, 2, common_random, antithetic)
+
+
+def lookback(strat1_cls: Type[Strategy], strat2_cls: Type[Strategy]) -> Optional[int]:
+    """
+    Returns the number of the last rounds that have to be kept for both strategies to play,
+    or `None` if either of them doesn't declare its `memory`.
+    """
+    if strat1_cls.memory is None or strat2_cls.memory is None:
+        return None
+    # state machines step on the last round even if they ignore it, like `AlwaysCooperate`
+    return max(strat1_cls.memory, strat2_cls.memory, 1)
+
+
+def new_history(strat1_cls: Type[Strategy], strat2_cls: Type[Strategy], keep: bool) -> History:
+    """
+    Returns an empty history for the match between the two strategies.
+
+    Unless the whole history has to be kept, to render the moves, it's bounded
+    to the last rounds the strategies look at, if they both declare their `memory`.
+    """
+    if not keep:
+        capacity = lookback(strat1_cls, strat2_cls)
+        if capacity is not None:
+            return BoundedHistory(capacity)
+    return History()
+
+
+def match(
+    strat1_cls: Type[Strategy],
+    strat2_cls: Type[Strategy],
+    round_len: int = ROUND_LEN,
+    seed: Optional[int] = None,
+    repetition: int = 0,
+    common_random: bool = False,
+    antithetic: bool = False,
+    keep: bool = True,
+) -> History:
+    """
+    Match two strategies against each other.
+
+    If the master seed is given, the match is reproducible: the same seed and repetition
+    always produce the same moves. If `keep` is unset, the history may only keep the last rounds
+    the strategies look at, see `new_history` - it can be tallied, but not rendered then.
+
+    Matches between two strategies certified by `conformance.certified` don't check
+    every move. If one of them makes an invalid move after all, the match is replayed
+    with every move checked, to fail the same way it would otherwise.
+
+    Returns the match history as seen from the point of view of the first strategy.
+    """
+    args = (strat1_cls, strat2_cls, round_len, seed, repetition, common_random, antithetic, keep)
+    if certified(strat1_cls) and certified(strat2_cls):
+        try:
+            return _match(*args, checked=False)
+        except _InvalidMove:
+            pass
+    return _match(*args, checked=True)
+
+
+class _InvalidMove(Exception):
+    """
+    Raised by matches that don't check every move in full, once a move turns out to be invalid.
+    """
+
+
+# the types of valid moves, checked exactly, so that subclasses like NumPy integers aren't valid
+_MOVE_TYPES = (int, bool)
+
+
+def _match(
+    strat1_cls: Type[Strategy],
+    strat2_cls: Type[Strategy],
+    round_len: int,
+    seed: Optional[int],
+    repetition: int,
+    common_random: bool,
+    antithetic: bool,
+    keep: bool,
+    checked: bool,
+) -> History:
+    # init the strategies
+    strat1: Strategy = strat1_cls()
+    strat2: Strategy = strat2_cls()
+    if seed is not None:
+        seed_match(strat1, strat2, seed, repetition, common_random, antithetic)
+    # simulate
+    history1 = new_history(strat1_cls, strat2_cls, keep)
+    history2 = history1.mirror()
+    if not checked:
+        play1, play2, record = strat1.play, strat2.play, history1.record
+        for i in range(round_len):
+            move1 = play1(history1)
+            move2 = play2(history2)
+            # a quick check of both moves at once, the checked match reports which one it was
+            if (
+                type(move1) not in _MOVE_TYPES
+                or type(move2) not in _MOVE_TYPES
+                or move1 | move2 not in (0, 1)
+            ):
+                raise _InvalidMove
+            record(move1, move2)
+        return history1
+    for i in range(round_len):
+        result1: int = strat1.play(history1)
+        if isinstance(result1, bool):
+            result1 = int(result1)
+        if not (isinstance(result1, int) and 0 <= result1 <= 1):
+            raise RuntimeError(
+                f"Strategy {strat1_cls.name} returned an invalid move: {result1}"
+            )
+        result2: int = strat2.play(history2)
+        if isinstance(result2, bool):
+            result2 = int(result2)
+        if not (isinstance(result2, int) and 0 <= result2 <= 1):
+            raise RuntimeError(
+                f"Strategy {strat2_cls.name} returned an invalid move: {result2}"
+            )
+        history1.record(result1, result2)
+    return history1
+
+
+class _TrackedHistory(Sequence[Tuple[int, int]]):
+    """
+    A read-only view of the history, that keeps track of how the strategy looked into it.
+
+    `depth` is the deepest lookback (`history[-depth]`) accessed,
+    while `opaque` is set whenever the strategy did something that depends
+    on the current round number - like calling `len(history)` or iterating over the history,
+    or reading any of its aggregates that cover the whole match, like the scores.
+    Reading fixed positions (`history[0]`, `history[:4]`) is fine, as those never change
+    once they've been played.
+    """
+    __slots__ = ("_history", "depth", "opaque")
+
+    def __init__(self, history: History):
+        self._history = history
+        self.depth = 0
+        self.opaque = False
+
+    def __len__(self) -> int:
+        self.opaque = True
+        return len(self._history)
+
+    def __bool__(self) -> bool:
+        return bool(self._history)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        self.opaque = True
+        return iter(self._history)
+
+    def __reversed__(self) -> Iterator[Tuple[int, int]]:
+        self.opaque = True
+        return reversed(self._history)
+
+    def __getitem__(self, key):  # type: ignore[override]
+        length = len(self._history)
+        if isinstance(key, slice):
+            start, stop, step = key.start, key.stop, key.step
+            if step is not None and step < 0:
+                self.opaque = True
+            elif start is not None and start < 0 and (stop is None or stop < 0):
+                # relative to the end, like history[-3:] or history[-3:-1]
+                self.depth = max(self.depth, -start)
+            elif (start is None or start >= 0) and stop is not None and 0 <= stop <= length:
+                # fixed, already played positions, like history[:4]
+                pass
+            else:
+                self.opaque = True
+        elif key < 0:
+            self.depth = max(self.depth, -key)
+        elif key >= length:
+            self.opaque = True
+        return self._history[key]
+
+    @property
+    def own_cooperations(self) -> int:
+        self.opaque = True
+        return self._history.own_cooperations
+
+    @property
+    def opponent_cooperations(self) -> int:
+        self.opaque = True
+        return self._history.opponent_cooperations
+
+    @property
+    def own_defection_streak(self) -> int:
+        self.opaque = True
+        return self._history.own_defection_streak
+
+    @property
+    def opponent_defection_streak(self) -> int:
+        self.opaque = True
+        return self._history.opponent_defection_streak
+
+    def scores(self, outcomes: Sequence[Sequence[float]]) -> Tuple[float, float]:
+        self.opaque = True
+        return self._history.scores(outcomes)
+
+    def recent(self, rounds: int) -> int:
+        # the same as looking at `history[-rounds:]`
+        self.depth = max(self.depth, rounds)
+        return self._history.recent(rounds)
+
+
+def _snapshot(strat: Strategy) -> bytes:
+    """
+    Returns a comparable snapshot of the strategy instance's state.
+    """
+    return pickle.dumps(getattr(strat, "__dict__", None))
+
+
+def _play(strat: Strategy, history: Any) -> int:
+    """
+    Let the strategy make its move, making sure it's a valid one.
+    """
+    result: int = strat.play(history)
+    if isinstance(result, bool):
+        result = int(result)
+    if not (isinstance(result, int) and 0 <= result <= 1):
+        raise RuntimeError(
+            f"Strategy {type(strat).name} returned an invalid move: {result}"
+        )
+    return result
+
+
+def fast_match(
+    strat1_cls: Type[Strategy], strat2_cls: Type[Strategy], round_len: int = ROUND_LEN
+) -> MatchResult:
+    """
+    Match two deterministic strategies against each other, fast-forwarding through cycles.
+
+    Before each round, the joint state of the match is recorded: the state of both
+    strategy instances, and the part of the history they're looking at - either their
+    declared `memory`, or, if they don't have one, whatever they've been looking at so far.
+    Once a state repeats, and the strategies didn't look at anything else in between,
+    every following round has to repeat the same cycle too. The rest of the match
+    is then extrapolated from it, instead of being simulated.
+
+    Strategies whose state can't be pickled, and so compared, have their match fully simulated.
+
+    Returns the same result a fully simulated match would.
+    """
+    # init the strategies
+    strat1: Strategy = strat1_cls()
+    strat2: Strategy = strat2_cls()
+    history1 = History()
+    history2 = history1.mirror()
+    # strategies that don't declare their memory have their history access tracked instead
+    view1 = history1 if strat1_cls.memory is not None else _TrackedHistory(history1)
+    view2 = history2 if strat2_cls.memory is not None else _TrackedHistory(history2)
+    tracked = [view for view in (view1, view2) if isinstance(view, _TrackedHistory)]
+    # how many of the last rounds the strategies have been looking at
+    depth = max(strat1_cls.memory or 0, strat2_cls.memory or 0)
+    seen: Dict[Tuple[int, bool, bytes, bytes, Tuple[Tuple[int, int], ...]], int] = {}
+    for i in range(round_len):
+        try:
+            snapshot1 = _snapshot(strat1)
+            snapshot2 = _snapshot(strat2)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            # the state can't be compared, like generators or locks, so neither can the cycles
+            return total(match(strat1_cls, strat2_cls, round_len))
+        state = (
+            depth,
+            bool(history1),
+            snapshot1,
+            snapshot2,
+            tuple(history1[-depth:]) if depth else (),
+        )
+        if state in seen:
+            # the match has entered a cycle - extrapolate the rest of it
+            start = seen[state]
+            prefix = total(history1[:start])
+            cycle = total(history1[start:])
+            cycles, remainder = divmod(round_len - start, i - start)
+            tail = total(history1[start:start + remainder])
+            return MatchResult(
+                prefix.score1 + cycles * cycle.score1 + tail.score1,
+                prefix.score2 + cycles * cycle.score2 + tail.score2,
+                prefix.moves1 + cycles * cycle.moves1 + tail.moves1,
+                prefix.moves2 + cycles * cycle.moves2 + tail.moves2,
+            )
+        seen[state] = i
+        # simulate
+        for view in tracked:
+            view.depth = 0
+            view.opaque = False
+        result1 = _play(strat1, view1)
+        result2 = _play(strat2, view2)
+        history1.record(result1, result2)
+        for view in tracked:
+            if view.opaque or view.depth > depth:
+                # no cycle can contain this round
+                depth = max(depth, view.depth)
+                seen.clear()
+    return total(history1)
+
+
+class _OutOfTime(BaseException):
+    """
+    Interrupts a strategy that's run out of time. It's not an `Exception`,
+    so that strategies catching those don't catch this one too.
+    """
+
+
+# set only while a timed strategy is making its move, so that a late alarm can't interrupt
+# anything else
+_armed = False
+
+
+def _alarm(signum: int, frame: Any) -> None:
+    if _armed:
+        raise _OutOfTime
+
+
+def timed_match(task: MatchTask) -> MatchResult:
+    """
+    Simulate a single match, timing every move, and enforcing the task's time limits.
+
+    A strategy whose move takes longer than `task.move_time_limit`, or which runs the whole match
+    over `task.match_time_limit`, forfeits the match: it's scored as if it had cooperated
+    in every round, while its opponent defected. Where `signal.setitimer` is available
+    (so not on Windows), moves are interrupted as soon as they run out of time,
+    otherwise they can only be checked once they're done.
+    """
+    global _armed
+    strat1: Strategy = task.strat1_cls()
+    strat2: Strategy = task.strat2_cls()
+    if task.seed is not None:
+        seed_match(
+            strat1, strat2, task.seed, task.repetition, task.common_random, task.antithetic
+        )
+    history1 = new_history(task.strat1_cls, task.strat2_cls, task.renders(task.repetition))
+    players = ((strat1, history1), (strat2, history1.mirror()))
+    limited = bool(task.move_time_limit or task.match_time_limit)
+    interrupt = (
+        limited
+        and hasattr(signal, "setitimer")
+        and threading.current_thread() is threading.main_thread()
+    )
+    if interrupt:
+        previous = signal.signal(signal.SIGALRM, _alarm)
+    spent = [0.0, 0.0]
+    longest = [0.0, 0.0]
+    forfeit = 0
+    start = perf_counter()
+    try:
+        for i in range(task.round_len):
+            moves = []
+            for side, (strat, history) in enumerate(players):
+                budget = task.move_time_limit or float("inf")
+                if task.match_time_limit:
+                    budget = min(budget, task.match_time_limit - (perf_counter() - start))
+                move_start = perf_counter()
+                move: Optional[int] = None
+                if budget > 0:
+                    try:
+                        if interrupt:
+                            # armed first, so that the alarm can't go off unnoticed
+                            _armed = True
+                            signal.setitimer(signal.ITIMER_REAL, budget)
+                        move = _play(strat, history)
+                        _armed = False
+                    except _OutOfTime:
+                        pass
+                    finally:
+                        _armed = False
+                        if interrupt:
+                            signal.setitimer(signal.ITIMER_REAL, 0)
+                elapsed = perf_counter() - move_start
+                spent[side] += elapsed
+                longest[side] = max(longest[side], elapsed)
+                if move is None or elapsed > budget:
+                    forfeit = side + 1
+                    break
+                moves.append(move)
+            if forfeit:
+                break
+            history1.record(*moves)
+    finally:
+        if interrupt:
+            signal.signal(signal.SIGALRM, previous)
+    timing = MatchTiming(
+        spent[0], longest[0], spent[1], longest[1], len(history1) + bool(forfeit),
+        perf_counter() - start,
+    )
+    result = total(history1, render=task.renders(task.repetition))
+    if forfeit:
+        result = forfeited(result, forfeit, task.round_len)
+    return result._replace(timing=timing)
+
+
+def forfeited(result: MatchResult, forfeit: int, round_len: int) -> MatchResult:
+    """
+    Returns the result of the match forfeited by the strategy on the given side (1 or 2):
+    it's scored as if it had cooperated in every round, while its opponent defected.
+    The moves played up to that point are kept.
+    """
+    # the worst possible result for the offender, and the best one for its opponent
+    lost = OUTCOMES[1][0] * round_len
+    won = OUTCOMES[0][1] * round_len
+    return result._replace(
+        score1=lost if forfeit == 1 else won,
+        score2=won if forfeit == 1 else lost,
+        forfeit=forfeit,
+    )
+
+
+def table_driven(strat_cls: Type[Strategy]) -> bool:
+    """
+    Returns `True` if the strategy plays purely by its state machine tables.
+    """
+    return (
+        issubclass(strat_cls, FSMStrategy)
+        and strat_cls.play is FSMStrategy.play  # type: ignore[comparison-overlap]
+    )
+
+
+@lru_cache(maxsize=None)
+def _compile(strat_cls: Type[FSMStrategy]) -> Tuple[bytes, array]:
+    """
+    Flattens the state machine of the given strategy into compact arrays: the move made
+    in each state, and the next state, indexed by `state << 1 | opponent_move`.
+    """
+    moves = bytes(strat_cls.moves)
+    transitions = array('I', [state for pair in strat_cls.transitions for state in pair])
+    return moves, transitions
+
+
+def fsm_match(
+    strat1_cls: Type[FSMStrategy],
+    strat2_cls: Type[FSMStrategy],
+    round_len: int = ROUND_LEN,
+    render: bool = True,
+) -> MatchResult:
+    """
+    Match two table-driven strategies against each other, without calling their `play` at all.
+
+    Both state machines are stepped together, using their tables directly. Once the pair
+    of states repeats, so does the rest of the match, which is then extrapolated from
+    the cycle - so no more than `len(moves1) * len(moves2)` rounds are ever stepped through.
+
+    Returns the same result a regular match would.
+    """
+    moves1, transitions1 = _compile(strat1_cls)
+    moves2, transitions2 = _compile(strat2_cls)
+    states2 = len(moves2)
+    state1 = strat1_cls.initial
+    state2 = strat2_cls.initial
+    # every round, encoded like `History` does it
+    rounds = bytearray()
+    # the round each pair of states was first seen in
+    seen: Dict[int, int] = {}
+    for i in range(round_len):
+        key = state1 * states2 + state2
+        if key in seen:
+            # the match has entered a cycle - extrapolate the rest of it
+            start = seen[key]
+            cycle = rounds[start:]
+            cycles, remainder = divmod(round_len - start, i - start)
+            rounds[start:] = cycle * cycles + cycle[:remainder]
+            break
+        seen[key] = i
+        move1 = moves1[state1]
+        move2 = moves2[state2]
+        rounds.append(move1 << 1 | move2)
+        state1 = transitions1[state1 << 1 | move2]
+        state2 = transitions2[state2 << 1 | move1]
+    return total(History(rounds), render=render)
+
+
+def total(history: Sequence[Tuple[int, int]], render: bool = True) -> MatchResult:
+    """
+    Total up the score of the given match history.
+    """
+    if isinstance(history, History):
+        tally = history.tally()
+        score1 = score2 = 0
+        for move1 in (0, 1):
+            for move2 in (0, 1):
+                score1 += tally[move1][move2] * OUTCOMES[move1][move2]
+                score2 += tally[move1][move2] * OUTCOMES[move2][move1]
+        if render:
+            return MatchResult(score1, score2, *history.render(LETTERS))
+        return MatchResult(score1, score2, '', '')
+    score1 = score2 = 0
+    line1 = []
+    line2 = []
+    for move1, move2 in history:
+        line1.append(LETTERS[move1])
+        line2.append(LETTERS[move2])
+        score1 += OUTCOMES[move1][move2]
+        score2 += OUTCOMES[move2][move1]
+    if render:
+        return MatchResult(score1, score2, ''.join(line1), ''.join(line2))
+    return MatchResult(score1, score2, '', '')
+
+
+def prefix_scores(history: History) -> Tuple[List[int], List[int]]:
+    """
+    Returns the cumulative scores of both strategies over the match: `scores1[n]` is the score
+    of the first strategy after the first `n` rounds, so it starts at 0.
+
+    Since strategies don't know when the match ends, its first `n` rounds play out the same
+    as a match of just `n` rounds would, so a single match scores every shorter one too.
+    """
+    payoffs1 = [OUTCOMES[move1][move2] for move1, move2 in history]
+    payoffs2 = [OUTCOMES[move2][move1] for move1, move2 in history]
+    return list(accumulate(payoffs1, initial=0)), list(accumulate(payoffs2, initial=0))
+
+
+def run_match(task: MatchTask) -> MatchResult:
+    """
+    Simulate a single match and total up its score.
+
+    This is the unit of work handed over to the worker processes.
+    """
+    if task.exact:
+        # the scores are evaluated exactly, a single match is played only to show its moves
+        vector1 = memory_one(task.strat1_cls)
+        vector2 = memory_one(task.strat2_cls)
+        assert vector1 is not None and vector2 is not None
+        scores = expected_scores(vector1, vector2, task.round_len)
+        if not task.render:
+            return MatchResult(*scores, '', '')
+        history = match(task.strat1_cls, task.strat2_cls, task.round_len, task.seed)
+        return MatchResult(*scores, *history.render(LETTERS))
+    if task.profile or task.move_time_limit or task.match_time_limit:
+        return timed_match(task)
+    if table_driven(task.strat1_cls) and table_driven(task.strat2_cls):
+        return fsm_match(
+            task.strat1_cls,  # type: ignore[arg-type]
+            task.strat2_cls,  # type: ignore[arg-type]
+            task.round_len,
+            render=task.renders(task.repetition),
+        )
+    if task.fast_forward and not (task.strat1_cls.stochastic or task.strat2_cls.stochastic):
+        return fast_match(task.strat1_cls, task.strat2_cls, task.round_len)
+    history = match(
+        task.strat1_cls,
+        task.strat2_cls,
+        task.round_len,
+        task.seed,
+        task.repetition,
+        task.common_random,
+        task.antithetic,
+        keep=task.renders(task.repetition),
+    )
+    return total(history, render=task.renders(task.repetition))
+
+
+def run_matches(task: MatchTask) -> List[MatchResult]:
+    """
+    Simulate every repetition of the match the task covers, and total up their scores.
+    """
+    if task.repetitions > 1:
+        # imported here, as NumPy is needed only for batches
+        from batch import run_batch
+        return run_batch(task)
+    return [run_match(task)]
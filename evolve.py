@@ -0,0 +1,226 @@
+"""
+Genetic search: evolve new lookup table strategies, that do well against the existing ones.
+
+Every candidate is a `LookupStrategy`, its genome being the opening moves followed by the table.
+Its fitness is its average score against the roster of strategies, scored just like `main.py`
+does it. Since lookup tables compile into state machines, matches against the table-driven
+strategies of the roster run on the match kernel. Candidates are evaluated in batches,
+spread across the worker processes, and the fitness of every genome is remembered,
+so that the survivors of each generation are never evaluated again.
+
+The best candidates are exported into `evolved.py`, as regular strategies.
+Move it into the `strategies` folder, to have them take part in the tournament.
+"""
+from random import Random
+from functools import lru_cache
+from itertools import combinations
+from multiprocessing import Pool
+from math import floor, log10
+from typing import DefaultDict, Dict, List, Optional, Tuple, Type
+
+import main
+from strategy import Strategy, LookupStrategy
+from constants import ROUND_LEN, SEED
+from engine import run_matches
+from main import strategies, with_stochastic, workers, pair_tasks, average, play
+
+
+# The number of the last rounds the lookup tables look at
+memory_depth: int = 3
+# The number of candidates in each generation
+population: int = 100
+# The number of generations to evolve
+generations: int = 50
+# The number of the best candidates carried over into the next generation unchanged
+elite: int = 10
+# The chance of every move in the genome of a new candidate being flipped
+mutation_rate: float = 0.02
+# The number of candidates competing for being selected as a parent
+tournament_size: int = 3
+# The number of candidates evaluated together, by a single worker process
+evaluation_batch: int = 10
+# The number of the best candidates exported into `evolved.py`
+export_count: int = 3
+# The seed used for the genetic operators, for reproducibility
+seed: int = 0
+
+
+# the opening moves, followed by the lookup table
+Genome = Tuple[int, ...]
+
+
+@lru_cache(maxsize=4096)
+def candidate(genome: Genome) -> Type[LookupStrategy]:
+    """
+    Returns the strategy playing the given genome.
+
+    All candidates share the same name, so that they all get the same random number streams
+    against the stochastic strategies of the roster.
+    """
+    return type("Candidate", (LookupStrategy,), {
+        "opening": genome[:memory_depth],
+        "table": genome[memory_depth:],
+        "__module__": __name__,
+    })
+
+
+def roster() -> List[Type[Strategy]]:
+    """
+    Returns the strategies the candidates are evaluated against.
+    """
+    if not with_stochastic:
+        return [s for s in strategies if not s.stochastic]
+    return strategies
+
+
+def pair_scores(genome: Genome) -> List[Tuple[float, float]]:
+    """
+    Returns the average scores of the candidate, and of each strategy of the roster,
+    from their matches against each other.
+    """
+    candidate_cls = candidate(genome)
+    return [
+        average([
+            result
+            for task in pair_tasks(candidate_cls, strat_cls)
+            for result in run_matches(task)
+        ])
+        for strat_cls in roster()
+    ]
+
+
+def evaluate(genomes: List[Genome]) -> List[float]:
+    """
+    Returns the fitness of each of the given genomes: their average score against the roster,
+    the same one they'd get in the AVERAGE SCORES section of `results.txt`.
+    """
+    return [
+        sum(score for score, _ in pair_scores(genome)) / len(roster()) for genome in genomes
+    ]
+
+
+def _init_worker(round_len: int, seed: Optional[int]) -> None:
+    # worker processes started via `spawn` draw their own round length and seed
+    main.ROUND_LEN = round_len
+    main.SEED = seed
+
+
+def random_genome(rng: Random) -> Genome:
+    return tuple(rng.randint(0, 1) for _ in range(memory_depth + 4 ** memory_depth))
+
+
+def select(rng: Random, ranked: List[Genome], fitness: Dict[Genome, float]) -> Genome:
+    """
+    Tournament selection: the fittest of a few random candidates.
+    """
+    return max(rng.sample(ranked, min(tournament_size, len(ranked))), key=fitness.__getitem__)
+
+
+def breed(rng: Random, parent1: Genome, parent2: Genome) -> Genome:
+    """
+    Uniform crossover of both parents, followed by mutation.
+    """
+    return tuple(
+        (move1 if rng.random() < 0.5 else move2) ^ (rng.random() < mutation_rate)
+        for move1, move2 in zip(parent1, parent2)
+    )
+
+
+def export(path: str, best: List[Tuple[Genome, float]]) -> None:
+    """
+    Writes the given genomes into a module, as regular lookup table strategies.
+    """
+    with open(path, "w", encoding="utf8") as file:
+        file.write(
+            '"""\n'
+            "Strategies evolved by `evolve.py`.\n"
+            "Move this file into the `strategies` folder,"
+            " to have them take part in the tournament.\n"
+            '"""\n'
+            "from strategy import LookupStrategy\n"
+        )
+        for n, (genome, fitness) in enumerate(best, start=1):
+            opening = genome[:memory_depth]
+            table = genome[memory_depth:]
+            rows = [
+                ", ".join(map(str, table[i:i + 16])) + ','
+                for i in range(0, len(table), 16)
+            ]
+            file.write(
+                f"\n\nclass Evolved{n}(LookupStrategy):\n"
+                '    """\n'
+                f"    A memory-{memory_depth} lookup table, evolved to score {fitness:.4f}"
+                " against the roster.\n"
+                '    """\n'
+                f"    opening = ({', '.join(map(str, opening))},)\n"
+                "    table = (\n"
+                + ''.join(f"        {row}\n" for row in rows)
+                + "    )\n"
+            )
+
+
+if __name__ == "__main__":
+    rng = Random(seed)
+    fitness: Dict[Genome, float] = {}
+    pool = None
+    if workers != 1:
+        pool = Pool(workers or None, initializer=_init_worker, initargs=(ROUND_LEN, SEED))
+    current = [random_genome(rng) for _ in range(population)]
+    history: List[Tuple[float, float]] = []
+    try:
+        for generation in range(generations + 1):
+            # evaluate the candidates that haven't been evaluated yet, in batches
+            pending = list(dict.fromkeys(g for g in current if g not in fitness))
+            batches = [
+                pending[i:i + evaluation_batch] for i in range(0, len(pending), evaluation_batch)
+            ]
+            results = pool.map(evaluate, batches) if pool is not None else map(evaluate, batches)
+            for batch, batch_fitness in zip(batches, results):
+                fitness.update(zip(batch, batch_fitness))
+            ranked = sorted(set(current), key=fitness.__getitem__, reverse=True)
+            scores = [fitness[genome] for genome in current]
+            history.append((fitness[ranked[0]], sum(scores) / len(scores)))
+            print(f"{generation}/{generations}: {history[-1][0]}")
+            if generation == generations:
+                break
+            # breed the next generation
+            current = ranked[:elite]
+            while len(current) < population:
+                current.append(
+                    breed(rng, select(rng, ranked, fitness), select(rng, ranked, fitness))
+                )
+    finally:
+        if pool is not None:
+            pool.terminate()
+    best = [(genome, fitness[genome]) for genome in ranked[:export_count]]
+    export("evolved.py", best)
+    # the rank the best candidates would get in the tournament, joining the roster
+    roster_strategies = roster()
+    roster_scores: DefaultDict[str, float] = DefaultDict(float)
+    pairs = list(combinations(roster_strategies, 2))
+    for (strat1_cls, strat2_cls), pair_results in zip(pairs, play(pairs)):
+        round_score1, round_score2 = average(pair_results)
+        roster_scores[strat1_cls.name] += round_score1
+        roster_scores[strat2_cls.name] += round_score2
+    with open("evolve.csv", "w", encoding="utf8") as file:
+        file.write("generation,best,mean\n")
+        for generation, (best_fitness, mean_fitness) in enumerate(history):
+            file.write(f"{generation},{best_fitness},{mean_fitness}\n")
+    with open("evolve.txt", "w", encoding="utf8") as file:
+        file.write(f"Round length: {ROUND_LEN}\n")
+        file.write(f"Seed: {SEED}\n")
+        file.write(f"Memory depth: {memory_depth}\n")
+        file.write(f"Generations: {generations}\n")
+        file.write(f"Candidates evaluated: {len(fitness)}\n\n\n")
+        file.write("BEST CANDIDATES\n")
+        nw = floor(log10(len(best))) + 1
+        div = len(roster_strategies)
+        for n, (genome, score) in enumerate(best, start=1):
+            others = [
+                (roster_scores[strat_cls.name] + opponent_score) / div
+                for strat_cls, (_, opponent_score) in zip(roster_strategies, pair_scores(genome))
+            ]
+            rank = sum(other > score for other in others) + 1
+            file.write(
+                f"#{n:{nw}} Evolved{n}: {score} (would rank #{rank} of {div + 1})\n"
+            )
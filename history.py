@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+from typing import Optional, List, Tuple, Iterator, Sequence, overload
+
+
+# Every round is stored as a single byte: `first_player_move << 1 | second_player_move`.
+# These map them back into the (self, other) tuples, as seen by each of the players.
+_FIRST = ((0, 0), (0, 1), (1, 0), (1, 1))
+_SECOND = ((0, 0), (1, 0), (0, 1), (1, 1))
+# the same round, encoded from the second player's point of view
+_SWAPPED = (0, 2, 1, 3)
+# how many of the last rounds `History.recent` can look at
+RECENT_LIMIT = 32
+_RECENT_MASK = (1 << 2 * RECENT_LIMIT) - 1
+
+
+class _Stats:
+    """
+    Aggregates of the match, shared by both players' views of the history.
+
+    They're brought up to date lazily, only once they're read, one round at a time,
+    so that reading them every round costs the same, no matter how long the match is.
+    """
+    __slots__ = ("rounds", "counts", "streak1", "streak2", "recent1", "recent2")
+
+    def __init__(self) -> None:
+        # the number of rounds the aggregates cover
+        self.rounds = 0
+        # how many times each of the encoded rounds happened
+        self.counts = [0, 0, 0, 0]
+        # the current defection streaks of the first and second player
+        self.streak1 = 0
+        self.streak2 = 0
+        # the last rounds, as seen by the first and second player, 2 bits each, oldest first
+        self.recent1 = 0
+        self.recent2 = 0
+
+    def add(self, code: int) -> None:
+        self.rounds += 1
+        self.counts[code] += 1
+        self.streak1 = 0 if code & 2 else self.streak1 + 1
+        self.streak2 = 0 if code & 1 else self.streak2 + 1
+        self.recent1 = (self.recent1 << 2 | code) & _RECENT_MASK
+        self.recent2 = (self.recent2 << 2 | _SWAPPED[code]) & _RECENT_MASK
+
+
+class History(Sequence[Tuple[int, int]]):
+    """
+    The history of a match, as seen from the point of view of one of the players.
+
+    Each round is stored only once, as a single byte, and shared between both players'
+    views of the match - `History.mirror` returns the opponent's view, without copying anything.
+    Indexing returns the usual (self, other) tuple of moves, while slicing returns
+    a list of them, so that it behaves just like the list of tuples it used to be.
+
+    Instead of going over the whole history, strategies can read some of its aggregates,
+    like how many times either player cooperated, the current defection streaks, the scores,
+    or the last few rounds. These are kept up to date incrementally, so reading them
+    costs the same every round, no matter how long the match is.
+    """
+    __slots__ = ("_moves", "_outcomes", "_mirrored", "_stats")
+
+    def __init__(
+        self,
+        moves: Optional[bytearray] = None,
+        *,
+        mirrored: bool = False,
+        stats: Optional[_Stats] = None,
+    ):
+        self._moves: bytearray = bytearray() if moves is None else moves
+        self._mirrored: bool = mirrored
+        self._outcomes = _SECOND if mirrored else _FIRST
+        self._stats: _Stats = _Stats() if stats is None else stats
+
+    def __repr__(self) -> str:
+        return f"History({list(self)!r})"
+
+    def __len__(self) -> int:
+        return len(self._moves)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        return map(self._outcomes.__getitem__, self._moves)
+
+    def __reversed__(self) -> Iterator[Tuple[int, int]]:
+        return map(self._outcomes.__getitem__, reversed(self._moves))
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, History):
+            return list(self) == list(other)
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    @overload
+    def __getitem__(self, index: int) -> Tuple[int, int]:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Tuple[int, int]]:
+        ...
+
+    def __getitem__(self, index):
+        try:
+            return self._outcomes[self._moves[index]]
+        except TypeError:
+            # slicing the moves returns a bytearray instead
+            return [self._outcomes[move] for move in self._moves[index]]
+
+    def mirror(self) -> History:
+        """
+        Returns the same history, as seen from the opponent's point of view.
+        """
+        return History(self._moves, mirrored=not self._mirrored, stats=self._stats)
+
+    def record(self, own: int, opponent: int) -> None:
+        """
+        Records a single round, as seen from the point of view of this history.
+        """
+        if self._mirrored:
+            self._moves.append(opponent << 1 | own)
+        else:
+            self._moves.append(own << 1 | opponent)
+
+    def tally(self) -> List[List[int]]:
+        """
+        Returns how many times each of the outcomes happened,
+        indexed the same way as `OUTCOMES`: `[own_move][opponent_move]`.
+        """
+        moves = self._moves
+        counts = [moves.count(code) for code in range(4)]
+        if self._mirrored:
+            return [[counts[0], counts[2]], [counts[1], counts[3]]]
+        return [[counts[0], counts[1]], [counts[2], counts[3]]]
+
+    def render(self, letters: Tuple[str, str]) -> Tuple[str, str]:
+        """
+        Returns the own and opponent's moves, as strings of the given letters.
+        """
+        moves = self._moves.decode("latin-1")
+        return (
+            moves.translate({code: letters[own] for code, (own, _) in enumerate(self._outcomes)}),
+            moves.translate({code: letters[opn] for code, (_, opn) in enumerate(self._outcomes)}),
+        )
+
+    def _synced(self) -> _Stats:
+        """
+        Returns the aggregates, brought up to date with the rounds recorded since.
+        """
+        stats = self._stats
+        if stats.rounds < len(self._moves):
+            for code in self._moves[stats.rounds:]:
+                stats.add(code)
+        return stats
+
+    @property
+    def own_cooperations(self) -> int:
+        """
+        The number of times you cooperated so far.
+        """
+        counts = self._synced().counts
+        return counts[1] + counts[3] if self._mirrored else counts[2] + counts[3]
+
+    @property
+    def opponent_cooperations(self) -> int:
+        """
+        The number of times your opponent cooperated so far.
+        """
+        counts = self._synced().counts
+        return counts[2] + counts[3] if self._mirrored else counts[1] + counts[3]
+
+    @property
+    def own_defection_streak(self) -> int:
+        """
+        The number of times you defected in a row, in the last rounds.
+        """
+        stats = self._synced()
+        return stats.streak2 if self._mirrored else stats.streak1
+
+    @property
+    def opponent_defection_streak(self) -> int:
+        """
+        The number of times your opponent defected in a row, in the last rounds.
+        """
+        stats = self._synced()
+        return stats.streak1 if self._mirrored else stats.streak2
+
+    def scores(self, outcomes: Sequence[Sequence[float]]) -> Tuple[float, float]:
+        """
+        Returns your and your opponent's score so far, under the given outcomes.
+        Pass `Strategy.OUTCOMES` here, so that the scores follow the outcomes being played.
+        """
+        counts = self._synced().counts
+        if self._mirrored:
+            dd, dc, cd, cc = counts[0], counts[2], counts[1], counts[3]
+        else:
+            dd, dc, cd, cc = counts
+        return (
+            dd * outcomes[0][0] + dc * outcomes[0][1] + cd * outcomes[1][0] + cc * outcomes[1][1],
+            dd * outcomes[0][0] + dc * outcomes[1][0] + cd * outcomes[0][1] + cc * outcomes[1][1],
+        )
+
+    def recent(self, rounds: int) -> int:
+        """
+        Returns the last few rounds (up to `RECENT_LIMIT` of them), packed into an integer,
+        oldest first, 2 bits for each round: `own_move << 1 | opponent_move`.
+        This is the index `LookupStrategy.table` uses. Rounds before the start of the match
+        are read as both players having defected.
+        """
+        if not 0 <= rounds <= RECENT_LIMIT:
+            raise ValueError(f"Only the last {RECENT_LIMIT} rounds can be looked at")
+        stats = self._synced()
+        recent = stats.recent2 if self._mirrored else stats.recent1
+        return recent & (1 << 2 * rounds) - 1
+
+
+class _Ring:
+    """
+    The state shared by both players' views of a `BoundedHistory`.
+    """
+    __slots__ = ("moves", "length")
+
+    def __init__(self, capacity: int):
+        self.moves = bytearray(capacity)
+        self.length = 0
+
+
+class BoundedHistory(History):
+    """
+    A history that keeps only the last `capacity` rounds, in a ring buffer,
+    while its aggregates are kept up to date with every round, so that its memory use
+    doesn't grow with the length of the match.
+
+    Its length is still the number of rounds played, and any of the kept rounds can be indexed
+    just like before, either relative to the end or to the start of the match. Indexing rounds
+    that have already been dropped raises `IndexError`, while iterating over it
+    only goes over the kept ones. The moves can't be rendered, but they can be tallied.
+    """
+    __slots__ = ("_ring",)
+
+    def __init__(self, capacity: int, *, mirrored: bool = False):
+        super().__init__(mirrored=mirrored)
+        self._ring = _Ring(capacity)
+
+    def __len__(self) -> int:
+        return self._ring.length
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        ring = self._ring
+        return map(self.__getitem__, range(max(ring.length - len(ring.moves), 0), ring.length))
+
+    def __reversed__(self) -> Iterator[Tuple[int, int]]:
+        ring = self._ring
+        return map(
+            self.__getitem__,
+            range(ring.length - 1, max(ring.length - len(ring.moves), 0) - 1, -1),
+        )
+
+    def __getitem__(self, index):
+        ring = self._ring
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(ring.length))]
+        if index < 0:
+            index += ring.length
+        if not 0 <= index < ring.length:
+            raise IndexError("history index out of range")
+        capacity = len(ring.moves)
+        if index < ring.length - capacity:
+            raise IndexError(f"only the last {capacity} rounds of the history are kept")
+        return self._outcomes[ring.moves[index % capacity]]
+
+    def mirror(self) -> BoundedHistory:
+        mirrored = BoundedHistory(0, mirrored=not self._mirrored)
+        mirrored._ring = self._ring
+        mirrored._stats = self._stats
+        return mirrored
+
+    def record(self, own: int, opponent: int) -> None:
+        ring = self._ring
+        code = opponent << 1 | own if self._mirrored else own << 1 | opponent
+        if ring.moves:
+            ring.moves[ring.length % len(ring.moves)] = code
+        ring.length += 1
+        self._stats.add(code)
+
+    def _synced(self) -> _Stats:
+        # the dropped rounds can't be caught up with later, so these are always up to date
+        return self._stats
+
+    def tally(self) -> List[List[int]]:
+        counts = self._stats.counts
+        if self._mirrored:
+            return [[counts[0], counts[2]], [counts[1], counts[3]]]
+        return [[counts[0], counts[1]], [counts[2], counts[3]]]
+
+    def render(self, letters: Tuple[str, str]) -> Tuple[str, str]:
+        raise RuntimeError("Bounded histories don't keep the moves needed to render them")
@@ -0,0 +1,134 @@
+"""
+Random-length matches: how do the rankings change with the length of the matches?
+
+A single, fixed round length favours the strategies that happen to do well at that length.
+Here, matches end at random instead - either with a fixed probability after every round,
+or at a length drawn from a range. Every match is simulated only once, up to the longest length
+considered, and the cumulative sums of its payoffs then score it at every shorter length too,
+without simulating it again. Requires NumPy.
+"""
+from itertools import combinations
+from math import floor, log10
+from typing import List, Tuple, Type
+
+import numpy as np
+
+from strategy import Strategy
+from constants import ROUNDS, SEED
+from engine import match, prefix_scores
+from main import strategies, with_stochastic, common_random_numbers, antithetic
+
+
+# How the length of the matches is drawn:
+# • "geometric" - after every round, the match continues with the `continuation` probability
+# • "uniform" - uniformly from `length_range`, with a step of 2, just like `ROUND_LEN` is
+distribution: str = "geometric"
+continuation: float = 0.995
+length_range: Tuple[int, int] = (150, 300)
+# The longest match length considered, the geometric distribution is cut off there
+max_length: int = 1000
+# The match lengths the rankings are shown at
+horizons: List[int] = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+
+def length_probabilities() -> np.ndarray:
+    """
+    Returns the probability of a match being exactly as long as the index.
+    """
+    probabilities = np.zeros(max_length + 1)
+    if distribution == "geometric":
+        lengths = np.arange(1, max_length + 1)
+        probabilities[1:] = continuation ** (lengths - 1) * (1 - continuation)
+    elif distribution == "uniform":
+        if length_range[1] > max_length + 1:
+            raise RuntimeError(f"The length range goes past the longest length: {max_length}")
+        probabilities[length_range[0]:length_range[1]:2] = 1
+    else:
+        raise RuntimeError(f"Unknown length distribution: {distribution}")
+    return probabilities / probabilities.sum()
+
+
+def prefix_totals(strat1_cls: Type[Strategy], strat2_cls: Type[Strategy]) -> np.ndarray:
+    """
+    Returns the cumulative scores of both strategies, shaped (2, max_length + 1),
+    averaged over multiple rounds for stochastic strategies.
+    """
+    rounds = ROUNDS if strat1_cls.stochastic or strat2_cls.stochastic else 1
+    totals = np.zeros((2, max_length + 1))
+    for round in range(rounds):
+        history = match(
+            strat1_cls, strat2_cls, max_length, SEED, round, common_random_numbers, antithetic
+        )
+        totals += np.array(prefix_scores(history))
+    return totals / rounds
+
+
+def horizon_scores(strategies: List[Type[Strategy]]) -> np.ndarray:
+    """
+    Returns the total scores of all strategies, against all others, after each number of rounds,
+    shaped (strategies, max_length + 1).
+    """
+    totals = np.zeros((len(strategies), max_length + 1))
+    for i, j in combinations(range(len(strategies)), 2):
+        pair_totals = prefix_totals(strategies[i], strategies[j])
+        totals[i] += pair_totals[0]
+        totals[j] += pair_totals[1]
+    return totals
+
+
+def ranks(scores: np.ndarray) -> np.ndarray:
+    """
+    Returns the rank of every strategy, 1 being the best, for each column of scores.
+    """
+    ranked = np.empty_like(scores, dtype=int)
+    order = np.argsort(-scores, axis=0, kind="stable")
+    columns = np.arange(scores.shape[1])
+    ranked[order, columns] = np.arange(1, len(scores) + 1)[:, None]
+    return ranked
+
+
+if __name__ == "__main__":
+    if not with_stochastic:
+        strategies = [s for s in strategies if not s.stochastic]
+    probabilities = length_probabilities()
+    lengths = np.arange(max_length + 1)
+    totals = horizon_scores(strategies)
+    div = len(strategies) - 1
+    # the average score per round, at every match length
+    averages = totals[:, 1:] / lengths[1:] / div
+    # the expected score per round, with the match length drawn at random
+    expected_length = probabilities @ lengths
+    random_end = totals @ probabilities / expected_length / div
+    # the score per round of every strategy, at every match length
+    with open("horizon.csv", "w", encoding="utf8") as file:
+        file.write(','.join(["length", *(s.name for s in strategies)]) + '\n')
+        for length in range(1, max_length + 1):
+            file.write(','.join([str(length), *map(str, averages[:, length - 1].tolist())]) + '\n')
+    shown = [length for length in horizons if 1 <= length <= max_length]
+    horizon_ranks = ranks(averages[:, [length - 1 for length in shown]])
+    with open("horizon.txt", "w", encoding="utf8") as file:
+        file.write(f"Seed: {SEED}\n")
+        if distribution == "geometric":
+            file.write(f"Length distribution: geometric, continuing with {continuation}\n")
+        else:
+            low, high = length_range
+            file.write(f"Length distribution: uniform, from {low} to {high}\n")
+        file.write(f"Expected length: {expected_length:.2f}\n")
+        file.write(f"Longest length: {max_length}\n\n\n")
+        file.write("RANDOM END SCORES\n")
+        nw = floor(log10(len(strategies))) + 1
+        nl = max(len(s.name) for s in strategies) + 1
+        order = np.argsort(-random_end, kind="stable")
+        for i, n in enumerate(order, start=1):
+            file.write(f"#{i:{nw}} {f'{strategies[n].name}:':{nl}} {random_end[n]}\n")
+        file.write("\n\nRANKS BY HORIZON\n")
+        hw = max(nw + 1, max(len(str(length)) for length in shown))
+        file.write(
+            f"{'':{nw + nl + 3}}" + ' '.join(f"{length:>{hw}}" for length in shown) + '\n'
+        )
+        for i, n in enumerate(order, start=1):
+            file.write(
+                f"#{i:{nw}} {f'{strategies[n].name}:':{nl}} "
+                + ' '.join(f"{f'#{rank}':>{hw}}" for rank in horizon_ranks[n].tolist())
+                + '\n'
+            )
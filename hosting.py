@@ -0,0 +1,378 @@
+"""
+Out-of-process hosting of the strategies, so that they can't take the tournament down with them.
+
+Every hosted strategy runs in a long-lived host process of its own, and is never imported
+into `main.py`'s process - there, it's represented by a stand-in class (see `stand_in`).
+A strategy raising an error or returning an invalid move forfeits that match. One crashing
+or hanging its host forfeits the match that did it, and its host is started again: as there's
+no telling which match that was, the matches it was playing are each played again on their own.
+Once one of those hangs too, the rest are forfeited instead, so that a strategy that keeps
+hanging costs the timeout only twice per batch.
+
+Matches involving hosted strategies are played in lockstep batches: every round, each host
+makes its moves in all games of the batch at once, while the strategies that aren't hosted
+make theirs here. Hosts don't get sent the histories - they keep their own, and only get
+the opponents' last moves, through a buffer of shared memory, one byte per game,
+with a single byte sent through a pipe to signal that the round can be played.
+The moves come back the same way, so a round costs one round trip per host,
+no matter how many games it plays.
+"""
+import pickle
+from random import Random
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from collections import deque
+from typing import Deque, Dict, Iterable, Iterator, List, NoReturn, Optional, Set, Tuple, Type
+
+import registry
+from history import History
+from strategy import Strategy
+from registry import StrategyInfo
+from engine import (
+    MatchTask, MatchResult, strategy_random, new_history, total, forfeited, _play
+)
+
+
+# the input bytes of a game: the opponent's last move (0 or 1), or one of these
+FIRST = 2  # the game starts this round, there's no last move yet
+SKIP = 3  # the game is over, or has been forfeited
+# the output byte of a game: the strategy's move (0 or 1), or this
+FAILED = 2  # the strategy raised an error, or returned an invalid move
+
+_STEP = b"s"
+_STOP = b"x"
+_DONE = b"k"
+
+
+class HostedStrategy(Strategy):
+    """
+    Stands in for a strategy that's hosted out of process, see `stand_in`.
+    """
+    info: StrategyInfo
+
+    def play(self, history: History) -> NoReturn:
+        raise RuntimeError(f"Strategy {self.name} is hosted, it can only play through its host")
+
+
+def stand_in(info: StrategyInfo) -> Type[HostedStrategy]:
+    """
+    Returns the class standing in for the given strategy, without importing it.
+
+    It has the same name and module as the strategy itself, so that it's cached
+    and reported just the same.
+    """
+    return type(info.name, (HostedStrategy,), {
+        "__module__": info.module,
+        "__qualname__": info.name,
+        "info": info,
+        "stochastic": info.stochastic,
+    })
+
+
+def hosted(*strat_classes: Type[Strategy]) -> bool:
+    """
+    Returns `True` if any of the given strategies is hosted.
+    """
+    return any(issubclass(strat_cls, HostedStrategy) for strat_cls in strat_classes)
+
+
+def _serve(info: StrategyInfo, memory_name: str, capacity: int, conn: Connection) -> None:
+    """
+    The host process: plays the games of every batch it's sent, round by round.
+    """
+    memory = SharedMemory(memory_name)
+    assert memory.buf is not None
+    inputs = memory.buf[:capacity]
+    outputs = memory.buf[capacity:2 * capacity]
+    strat_cls = registry.load(info)
+    # the strategy instance, its history and its last move, of every game of the batch
+    games: List[Optional[Tuple[Strategy, History, int]]] = []
+    try:
+        while True:
+            message = conn.recv_bytes()
+            if message == _STOP:
+                break
+            if message != _STEP:
+                # a new batch, given the random number generator of every game
+                games = []
+                for generator in pickle.loads(message):
+                    strat = strat_cls()
+                    if generator is not None:
+                        strat.random = generator
+                    games.append((strat, History(), 0))
+                conn.send_bytes(_DONE)
+                continue
+            for slot, game in enumerate(games):
+                code = inputs[slot]
+                if game is None or code == SKIP:
+                    continue
+                strat, history, last = game
+                if code != FIRST:
+                    history.record(last, code)
+                try:
+                    move = _play(strat, history)
+                except Exception:
+                    games[slot] = None
+                    outputs[slot] = FAILED
+                    continue
+                games[slot] = (strat, history, move)
+                outputs[slot] = move
+            conn.send_bytes(_DONE)
+    finally:
+        inputs.release()
+        outputs.release()
+        memory.close()
+
+
+class Host:
+    """
+    A host process, playing the given strategy in up to `capacity` games at once.
+    """
+    def __init__(self, info: StrategyInfo, capacity: int, timeout: float):
+        self.info = info
+        self.capacity = capacity
+        self.timeout = timeout
+        self._memory = SharedMemory(create=True, size=2 * capacity)
+        assert self._memory.buf is not None
+        self.inputs = self._memory.buf[:capacity]
+        self.outputs = self._memory.buf[capacity:2 * capacity]
+        self._conn, child_conn = Pipe()
+        self._process = Process(
+            target=_serve, args=(info, self._memory.name, capacity, child_conn), daemon=True
+        )
+        self._process.start()
+        child_conn.close()
+        self.alive = True
+        # set once the host has run out of time, rather than crashed
+        self.hung = False
+
+    def _wait(self) -> bool:
+        try:
+            if not self._conn.poll(self.timeout):
+                self.hung = True
+            elif self._conn.recv_bytes() == _DONE:
+                return True
+        except (EOFError, OSError):
+            pass
+        # the host crashed or hung, there's no getting anything more out of it
+        self.kill()
+        return False
+
+    def start(self, games: List[Optional[Random]]) -> bool:
+        """
+        Starts a new batch of games, given the random number generator of each,
+        for the stochastic strategies. Returns `False` if the host failed.
+        """
+        if len(games) > self.capacity:
+            raise RuntimeError(
+                f"The host of {self.info.name} can't play {len(games)} games at once"
+            )
+        try:
+            self._conn.send_bytes(pickle.dumps(games))
+        except OSError:
+            self.kill()
+            return False
+        return self._wait()
+
+    def step(self) -> None:
+        """
+        Lets the host play a round, once the inputs have been written.
+        """
+        try:
+            self._conn.send_bytes(_STEP)
+        except OSError:
+            self.kill()
+
+    def wait(self) -> bool:
+        """
+        Waits for the host to finish the round, returning `False` if it failed.
+        """
+        return self.alive and self._wait()
+
+    def kill(self) -> None:
+        self.alive = False
+        if self._process.is_alive():
+            self._process.kill()
+        self._process.join()
+
+    def close(self) -> None:
+        if self.alive:
+            try:
+                self._conn.send_bytes(_STOP)
+            except OSError:
+                pass
+            self._process.join(self.timeout)
+            self.kill()
+        self._conn.close()
+        self.inputs.release()
+        self.outputs.release()
+        self._memory.close()
+        self._memory.unlink()
+
+
+class Hosts:
+    """
+    The hosts of all hosted strategies, started once they're first needed, and again
+    whenever they've failed.
+    """
+    def __init__(self, batch: int, timeout: float):
+        self.batch = batch
+        self.timeout = timeout
+        self._hosts: Dict[str, Host] = {}
+
+    def get(self, info: StrategyInfo) -> Host:
+        host = self._hosts.get(info.name)
+        if host is None or not host.alive:
+            if host is not None:
+                host.close()
+            # a strategy can take both sides of a game, when it plays itself
+            host = self._hosts[info.name] = Host(info, 2 * self.batch, self.timeout)
+        return host
+
+    def close(self) -> None:
+        for host in self._hosts.values():
+            host.close()
+        self._hosts.clear()
+
+    def _run(self, games: List[Tuple[MatchTask, int]]) -> List[MatchResult]:
+        """
+        Simulate the given repetitions of the tasks in lockstep, returning the result of each.
+
+        The strategies that aren't hosted play here, and fail just like they always do.
+        """
+        histories: List[History] = []
+        forfeits = [0] * len(games)
+        # the strategies playing here: the game, the side, the instance and its history
+        local: List[Tuple[int, int, Strategy, History]] = []
+        # the games of every host, by their slot: the game and the side
+        slots: Dict[Host, List[Tuple[int, int]]] = {}
+        starts: Dict[Host, List[Optional[Random]]] = {}
+        for game, (task, repetition) in enumerate(games):
+            history = new_history(task.strat1_cls, task.strat2_cls, task.renders(repetition))
+            histories.append(history)
+            for side, strat_cls, view in (
+                (1, task.strat1_cls, history), (2, task.strat2_cls, history.mirror())
+            ):
+                generator: Optional[Random] = None
+                if task.seed is not None and strat_cls.stochastic:
+                    generator = strategy_random(
+                        task.seed,
+                        task.strat1_cls,
+                        task.strat2_cls,
+                        repetition,
+                        side,
+                        task.common_random,
+                        task.antithetic,
+                    )
+                if issubclass(strat_cls, HostedStrategy):
+                    host = self.get(strat_cls.info)
+                    slots.setdefault(host, []).append((game, side))
+                    starts.setdefault(host, []).append(generator)
+                else:
+                    strat = strat_cls()
+                    if generator is not None:
+                        strat.random = generator
+                    local.append((game, side, strat, view))
+        # the games lost to their host failing as a whole, rather than to their own moves
+        crashed = [False] * len(games)
+        for host, host_games in starts.items():
+            if not host.start(host_games):
+                for game, side in slots[host]:
+                    forfeits[game] = forfeits[game] or side
+                    crashed[game] = True
+        moves = [[0, 0] for _ in games]
+        for round in range(max(task.round_len for task, _ in games)):
+            active = [
+                not forfeits[game] and round < task.round_len
+                for game, (task, _) in enumerate(games)
+            ]
+            if not any(active):
+                break
+            for host, host_slots in slots.items():
+                if not host.alive:
+                    continue
+                inputs = host.inputs
+                for slot, (game, side) in enumerate(host_slots):
+                    if not active[game]:
+                        inputs[slot] = SKIP
+                    elif round == 0:
+                        inputs[slot] = FIRST
+                    else:
+                        inputs[slot] = moves[game][2 - side]
+                host.step()
+            # the hosts play their moves meanwhile
+            for game, side, strat, view in local:
+                if active[game]:
+                    moves[game][side - 1] = _play(strat, view)
+            for host, host_slots in slots.items():
+                done = host.wait()
+                outputs = host.outputs
+                for slot, (game, side) in enumerate(host_slots):
+                    if not active[game] or forfeits[game]:
+                        continue
+                    move = outputs[slot] if done else FAILED
+                    if move == FAILED:
+                        forfeits[game] = side
+                        crashed[game] = not done
+                    else:
+                        moves[game][side - 1] = move
+            for game, history in enumerate(histories):
+                if active[game] and not forfeits[game]:
+                    history.record(*moves[game])
+        results: List[MatchResult] = []
+        # the hosted strategies that hung again, while playing a game on its own
+        hanging: Set[str] = set()
+        for game, (task, repetition) in enumerate(games):
+            result = total(histories[game], render=task.renders(repetition))
+            if forfeits[game]:
+                result = forfeited(result, forfeits[game], task.round_len)
+            if crashed[game] and len(games) > 1:
+                # there's no telling which game took the host down, so each one is played
+                # again on its own, making the results independent of the batch size.
+                # Each hang takes the whole timeout though, so once a strategy has hung
+                # on its own, the rest of its games are forfeited as they are.
+                name = (task.strat1_cls if forfeits[game] == 1 else task.strat2_cls).name
+                if name not in hanging:
+                    result = self._run([(task, repetition)])[0]
+                    if self._hosts[name].hung:
+                        hanging.add(name)
+            results.append(result)
+        return results
+
+    def run_all(self, tasks: Iterable[MatchTask]) -> Iterator[List[MatchResult]]:
+        """
+        Simulate every repetition of the given tasks, in batches of up to `batch` games,
+        yielding the results of each task, in order.
+
+        A task with more repetitions than that is split across multiple batches.
+        """
+        # the tasks and their number of repetitions, of the results not yielded yet
+        pending: Deque[Tuple[MatchTask, int]] = deque()
+        games: List[Tuple[MatchTask, int]] = []
+        results: List[MatchResult] = []
+        for task in tasks:
+            pending.append((task, task.repetitions))
+            games.extend(
+                (task, repetition)
+                for repetition in range(task.repetition, task.repetition + task.repetitions)
+            )
+            while len(games) >= self.batch:
+                results.extend(self._run(games[:self.batch]))
+                del games[:self.batch]
+                yield from self._finished(pending, results)
+        if games:
+            results.extend(self._run(games))
+            yield from self._finished(pending, results)
+
+    @staticmethod
+    def _finished(
+        pending: Deque[Tuple[MatchTask, int]], results: List[MatchResult]
+    ) -> Iterator[List[MatchResult]]:
+        """
+        Yields the results of the pending tasks that have all of their repetitions played.
+        """
+        while pending and pending[0][1] <= len(results):
+            _, count = pending.popleft()
+            yield results[:count]
+            del results[:count]
@@ -1,12 +1,26 @@
 import os
-import inspect
-import importlib
+import json
+import heapq
 from itertools import combinations
-from math import floor, log10, comb
-from typing import Optional, List, DefaultDict, Type
+from multiprocessing import Pool
+from multiprocessing.pool import Pool as PoolType
+from statistics import NormalDist, stdev
+from math import ceil, inf
+from typing import Optional, List, Dict, DefaultDict, Iterator, Tuple, Type
 
-from strategy import Strategy, History
-from constants import OUTCOMES, LETTERS, ROUNDS, ROUND_LEN
+import registry
+import hosting
+import checkpoint
+from strategy import Strategy
+from constants import ROUNDS, ROUND_LEN, SEED
+from cache import MatchCache
+from checkpoint import Checkpoint
+from traces import TraceWriter
+from standings import PairReport, Standings
+from hosting import Hosts
+from markov import memory_one
+from engine import MatchTask, MatchResult, run_matches
+from conformance import certified
 
 
 # Select the strategy to compare
@@ -19,30 +33,119 @@ with_stochastic: bool = True
 # Useful if you don't want to test all strategies, without moving files out of the folder
 exclude: List[str] = []
 
+# The number of worker processes the matches are spread across
+# Use 1 to run everything serially within this process, or 0 to use all available CPU cores
+workers: int = 1
 
-# load all strategies
+# The file the index of all strategies is kept in, so that only the modules that have changed
+# are read again on the next run. See `registry.py` for more details.
+# Use an empty string to read all of them every time
+index_file: str = "strategy_index.json"
+
+# The file deterministic match results are cached in, between the runs
+# Use an empty string to disable the cache
+cache_file: str = "match_cache.db"
+
+# Fast-forward deterministic matches once they enter a cycle, instead of simulating every round
+# Results are the same either way, but this makes very long rounds a lot cheaper
+fast_forward: bool = False
+
+# Evaluate stochastic matches between memory-one strategies exactly, instead of averaging them
+# over multiple rounds. See `Strategy.memory_one` for more details.
+exact_memory_one: bool = False
+
+# Simulate the repetitions of stochastic matches in batches of this size, in lockstep,
+# using the vectorized `Strategy.play_batch` where available. Requires NumPy.
+# Use 0 to simulate each repetition separately
+batch_size: int = 0
+
+# Reduce the variance of the stochastic matches' scores, so that the rankings settle down
+# with fewer rounds:
+# • common_random_numbers - strategies draw the same random numbers in the same round
+#   of each of their matches, no matter who they play against
+# • antithetic - every other round mirrors the random numbers drawn in the round before it
+# See `engine.strategy_random` for more details.
+common_random_numbers: bool = False
+antithetic: bool = False
+
+# Time every move of every strategy, and write the times into `results.txt`, next to the scores
+# Matches aren't served from the cache while profiling, or with either time limit set
+profile: bool = False
+# Time limits, in seconds, for a single move and a whole match (shared by both strategies)
+# Use 0 to disable either of them
+# A strategy exceeding them either:
+# • "forfeit" - forfeits the match, scoring as if it always cooperated,
+#   while its opponent defected
+# • "disqualify" - forfeits the match, and is removed from the rankings, along with its matches
+# Moves are interrupted as soon as they run out of time everywhere except on Windows,
+# where they can only be checked once they're done. Batched matches aren't timed.
+move_time_limit: float = 0.0
+match_time_limit: float = 0.0
+time_limit_action: str = "forfeit"
+
+# Keep replaying stochastic matches until the confidence interval of both averaged scores
+# is narrower than this, starting with `min_rounds` replays, up to `max_rounds` of them
+# Use 0 to always replay them exactly ROUNDS times
+confidence_width: float = 0.0
+confidence_level: float = 0.95
+min_rounds: int = 5
+max_rounds: int = 1000
+
+# Store the moves and scores of every match in this binary file, packed at 2 bits per round.
+# Any pair or match can be looked up in it via `traces.TraceReader`, without reading the rest.
+# Sharded runs write a file for each shard, covering the pairs of that shard.
+# Use an empty string to disable
+trace_file: str = ""
+# Write the moves of every pair into `results.txt`
+# With the traces stored, they can be left out, keeping `results.txt` down to the scores
+write_moves: bool = True
+
+# Save a checkpoint every this many pairs written into `results.txt`, so that a run
+# that's been interrupted can be resumed, by setting `resume`. It's removed once the run is done.
+# Replaying matches until they're precise enough writes all pairs at once, only at the very end.
+# Use 0 to disable
+checkpoint_every: int = 100
+checkpoint_file: str = "checkpoint.json"
+# Resume the interrupted run from its last checkpoint, instead of starting a new one
+resume: bool = False
+
+# Play only a part of the tournament, to spread it across multiple machines, as "i/n":
+# the i-th of n shards, each playing a share of the pairs that takes about as long as the others.
+# Each shard writes its results into `results-i-of-n.jsonl`, combine them into `results.txt`
+# with `merge.py`. All shards have to use the same `SEED` in `constants.py`.
+# Use an empty string to play the whole tournament
+shard: str = ""
+
+# Run these strategies out of process, each in a long-lived host process of its own, so that
+# crashing, raising errors, leaking memory or hanging can't take the tournament down with them.
+# They're never imported into this process, and forfeit the matches they fail in instead,
+# just like the ones exceeding the time limits do - see `time_limit_action`.
+# Their matches are played in lockstep batches of up to `host_batch` games, with the moves
+# exchanged over shared memory, so many of them are played at once. See `hosting.py` for details.
+# Hosted strategies have to use `Strategy.random` to stay reproducible, as the `random` module
+# isn't seeded for every match in their host. Hosted matches aren't timed,
+# and are played without `Strategy.play_batch`.
+hosted: List[str] = []
+host_batch: int = 256
+# How long, in seconds, a host can take to play a single round of a whole batch,
+# before it's considered hung, and killed
+host_timeout: float = 10.0
+
+
+# load the strategies that are going to play
 compare_strategy: Optional[Type[Strategy]] = None
 strategies: List[Type[Strategy]] = []
 
-strat_names: List[str] = []
-for name in os.listdir("./strategies"):
-    if not name.endswith(".py"):
-        continue
-    module = importlib.import_module(f"strategies.{name[:-3]}")
-    for obj in module.__dict__.values():
-        if inspect.isclass(obj) and obj is not Strategy and issubclass(obj, Strategy):
-            name = obj.name
-            if name in strat_names:
-                raise RuntimeError(f"{name} strategy already exists!")
-            strat_names.append(name)
-            if compare and name == compare and compare_strategy is None:
-                compare_strategy = obj
-            elif name in exclude:
-                # skip'em
-                pass
-            else:
-                strategies.append(obj)
-del strat_names
+for info in registry.index("strategies", index_file):
+    # hosted strategies are only imported by their hosts
+    load = hosting.stand_in if info.name in hosted else registry.load
+    if compare and info.name == compare and compare_strategy is None:
+        compare_strategy = load(info)
+    elif info.name in exclude or (info.stochastic and not with_stochastic):
+        # skip'em, without even importing them
+        pass
+    else:
+        strategies.append(load(info))
 # Run the compare strategy first
 if compare_strategy is not None:
     strategies.insert(0, compare_strategy)
@@ -51,89 +154,454 @@ elif compare:
     raise RuntimeError(f"Strategy {compare} set to compare, but doesn't exist!")
 
 
-def match(strat1_cls: Type[Strategy], strat2_cls: Type[Strategy]) -> History:
+def pair_tasks(
+    strat1_cls: Type[Strategy],
+    strat2_cls: Type[Strategy],
+    start: int = 0,
+    rounds: Optional[int] = None,
+) -> List[MatchTask]:
+    """
+    Returns the list of matches to be played between the two strategies.
+
+    Stochastic strategies are averaged over multiple rounds,
+    non-stochastic strategies are matched only once.
+    Stochastic memory-one strategies can be evaluated exactly instead, via a single match,
+    while the repetitions of other stochastic matches can be simulated in batches.
+    `start` and `rounds` select the repetitions of stochastic matches to be played.
+    """
+    stochastic = strat1_cls.stochastic or strat2_cls.stochastic
+    # the moves are only rendered if they're written somewhere
+    render = bool(write_moves or trace_file)
+    if rounds is None:
+        rounds = (min_rounds if confidence_width else ROUNDS) if stochastic else 1
+    if (
+        stochastic
+        and exact_memory_one
+        and not hosting.hosted(strat1_cls, strat2_cls)
+        and memory_one(strat1_cls) is not None
+        and memory_one(strat2_cls) is not None
+    ):
+        return [
+            MatchTask(
+                strat1_cls, strat2_cls, ROUND_LEN, 0, exact=True, seed=SEED, render=render
+            )
+        ]
+    if stochastic and batch_size > 0:
+        return [
+            MatchTask(
+                strat1_cls,
+                strat2_cls,
+                ROUND_LEN,
+                batch_start,
+                repetitions=min(batch_size, start + rounds - batch_start),
+                seed=SEED,
+                common_random=common_random_numbers,
+                antithetic=antithetic,
+                profile=profile,
+                move_time_limit=move_time_limit,
+                match_time_limit=match_time_limit,
+                render=render,
+            )
+            for batch_start in range(start, start + rounds, batch_size)
+        ]
+    return [
+        MatchTask(
+            strat1_cls,
+            strat2_cls,
+            ROUND_LEN,
+            round,
+            fast_forward,
+            seed=SEED,
+            common_random=common_random_numbers,
+            antithetic=antithetic,
+            profile=profile,
+            move_time_limit=move_time_limit,
+            match_time_limit=match_time_limit,
+            render=render,
+        )
+        for round in range(start, start + rounds)
+    ]
+
+
+def run_tasks(
+    tasks: List[MatchTask],
+    cache: Optional[MatchCache],
+    pool: Optional[PoolType],
+    hosts: Optional[Hosts] = None,
+) -> Iterator[List[MatchResult]]:
+    """
+    Run the given tasks, yielding the results of each of them.
+
+    Results are yielded in the order of tasks, regardless of which worker finishes first,
+    so that the scores are summed up in the exact same order as during a serial run.
+    Deterministic matches always end up the same, so they can be served from the cache,
+    unless they've been forfeited. The matches of hosted strategies are played by the hosts,
+    meanwhile the workers play the rest.
+    """
+    cached: Dict[MatchTask, MatchResult] = {}
+    if cache is not None:
+        for task in tasks:
+            cached_result = cache.get(task)
+            if cached_result is not None:
+                cached[task] = cached_result
+        if cached:
+            print(f"{len(cached)}/{len(tasks)} matches served from the cache")
+    remaining = [task for task in tasks if task not in cached]
+    hosted_results: Iterator[List[MatchResult]] = iter(())
+    if hosts is not None:
+        hosted_results = hosts.run_all(
+            task for task in remaining if hosting.hosted(task.strat1_cls, task.strat2_cls)
+        )
+        remaining = [
+            task for task in remaining if not hosting.hosted(task.strat1_cls, task.strat2_cls)
+        ]
+    results: Iterator[List[MatchResult]]
+    if pool is None:
+        results = map(run_matches, remaining)
+    else:
+        chunksize = max(1, len(remaining) // (pool._processes * 4))  # type: ignore[attr-defined]
+        results = pool.imap(run_matches, remaining, chunksize)
+    for task in tasks:
+        if task in cached:
+            yield [cached[task]]
+        else:
+            if hosts is not None and hosting.hosted(task.strat1_cls, task.strat2_cls):
+                task_results = next(hosted_results)
+            else:
+                task_results = next(results)
+            if cache is not None and not task_results[0].forfeit:
+                cache.put(task, task_results[0])
+            yield task_results
+
+
+def play(
+    pairs: List[Tuple[Type[Strategy], Type[Strategy]]]
+) -> Iterator[List[MatchResult]]:
+    """
+    Play every match between the given pairs of strategies, yielding the results of each pair,
+    in order.
+
+    If `confidence_width` is set, the stochastic pairs are then replayed, until their
+    scores are precise enough. This means all pairs have to be played before any are yielded.
+    """
+    pair_matches = [pair_tasks(strat1_cls, strat2_cls) for strat1_cls, strat2_cls in pairs]
+    cache: Optional[MatchCache] = None
+    # whether a match exceeds the time limits depends on the machine, not just on the strategies
+    if cache_file and not (profile or move_time_limit or match_time_limit):
+        cache = MatchCache(cache_file)
+    pool: Optional[PoolType] = None
+    hosts: Optional[Hosts] = None
+    try:
+        if workers != 1:
+            pool = Pool(workers or None)
+        if hosted:
+            hosts = Hosts(host_batch, host_timeout)
+        results = run_tasks(
+            [task for matches in pair_matches for task in matches], cache, pool, hosts
+        )
+        if not confidence_width:
+            for matches in pair_matches:
+                yield [result for _ in matches for result in next(results)]
+            return
+        all_results = [
+            [result for _ in matches for result in next(results)] for matches in pair_matches
+        ]
+        # keep replaying the stochastic pairs, until their scores are precise enough
+        while True:
+            replays: Dict[int, List[MatchTask]] = {}
+            for i, ((strat1_cls, strat2_cls), matches) in enumerate(zip(pairs, pair_matches)):
+                if matches[0].exact or not (strat1_cls.stochastic or strat2_cls.stochastic):
+                    continue
+                played = len(all_results[i])
+                needed = needed_rounds(all_results[i])
+                if needed > played:
+                    replays[i] = pair_tasks(strat1_cls, strat2_cls, played, needed - played)
+            if not replays:
+                break
+            results = run_tasks(
+                [task for matches in replays.values() for task in matches], cache, pool, hosts
+            )
+            for i, matches in replays.items():
+                for _ in matches:
+                    all_results[i].extend(next(results))
+        yield from all_results
+    finally:
+        if pool is not None:
+            pool.terminate()
+        if hosts is not None:
+            hosts.close()
+        if cache is not None:
+            cache.close()
+
+
+def average(pair_results: List[MatchResult]) -> Tuple[float, float]:
+    """
+    Returns the average per-round scores of both strategies, over all of the pair's matches.
     """
-    Match two strategies against each other.
+    round_score1 = round_score2 = 0.0
+    for result in pair_results:
+        round_score1 += result.score1 / ROUND_LEN
+        round_score2 += result.score2 / ROUND_LEN
+    if len(pair_results) > 1:
+        round_score1 /= len(pair_results)
+        round_score2 /= len(pair_results)
+    return round_score1, round_score2
+
+
+def confidence(pair_results: List[MatchResult]) -> Tuple[float, float]:
+    """
+    Returns the half-widths of the confidence intervals of both strategies' average scores.
+
+    The normal approximation is used, so the intervals are a bit too narrow for just a few rounds.
+    """
+    if len(pair_results) < 2:
+        # a single match means the scores are either deterministic or exact
+        return 0.0, 0.0
+    z = NormalDist().inv_cdf((1 + confidence_level) / 2)
+    n = len(pair_results)
+    return (
+        z * stdev(result.score1 / ROUND_LEN for result in pair_results) / n ** 0.5,
+        z * stdev(result.score2 / ROUND_LEN for result in pair_results) / n ** 0.5,
+    )
+
+
+def needed_rounds(pair_results: List[MatchResult]) -> int:
+    """
+    Returns the estimated number of rounds needed for both confidence intervals
+    to be narrower than `confidence_width`, capped at `max_rounds`.
+    """
+    played = len(pair_results)
+    half_width = max(confidence(pair_results))
+    if played >= max_rounds or 2 * half_width <= confidence_width:
+        return played
+    # the interval narrows with the square root of the number of rounds
+    needed = ceil(played * (2 * half_width / confidence_width) ** 2) if half_width else inf
+    return int(min(max_rounds, max(needed, played + 1)))
+
+
+def shard_spec() -> Tuple[int, int]:
+    """
+    Returns the shard this run plays, and the number of shards, parsed from `shard`.
+    """
+    try:
+        index, count = map(int, shard.split('/'))
+    except ValueError:
+        raise RuntimeError(f"Invalid shard: {shard}, expected \"i/n\"") from None
+    if not 1 <= index <= count:
+        raise RuntimeError(f"Invalid shard: {shard}, there's no shard {index} of {count}")
+    return index, count
+
 
-    Returns the match history as seen from the point of view of the first strategy.
+def shard_file(index: int, count: int) -> str:
     """
-    # init the strategies
-    strat1: Strategy = strat1_cls()
-    strat2: Strategy = strat2_cls()
-    # simulate
-    history1: History = []
-    history2: History = []
-    for i in range(ROUND_LEN):
-        result1: int = strat1.play(history1)
-        if isinstance(result1, bool):
-            result1 = int(result1)
-        if not (isinstance(result1, int) and 0 <= result1 <= 1):
-            raise RuntimeError(
-                f"Strategy {strat1_cls.name} returned an invalid move: {result1}"
+    Returns the name of the file the partial results of the given shard are written into.
+    """
+    return f"results-{index}-of-{count}.jsonl"
+
+
+def shard_pairs(
+    pairs: List[Tuple[Type[Strategy], Type[Strategy]]], count: int
+) -> List[List[int]]:
+    """
+    Splits the pairs between the given number of shards, returning the indices of each
+    shard's pairs, in order.
+
+    Pairs are balanced by their cost, the number of matches they play: the most expensive
+    pairs are handed out first, each one to the shard with the least work so far.
+    This always ends up the same, so every shard can work out its own pairs independently.
+    """
+    costs = [
+        sum(task.repetitions for task in pair_tasks(strat1_cls, strat2_cls))
+        for strat1_cls, strat2_cls in pairs
+    ]
+    loads = [(0, shard_index) for shard_index in range(count)]
+    shards: List[List[int]] = [[] for _ in range(count)]
+    for index in sorted(range(len(pairs)), key=lambda index: -costs[index]):
+        load, shard_index = heapq.heappop(loads)
+        shards[shard_index].append(index)
+        heapq.heappush(loads, (load + costs[index], shard_index))
+    for indices in shards:
+        indices.sort()
+    return shards
+
+
+def report(
+    strat1_cls: Type[Strategy], strat2_cls: Type[Strategy], pair_results: List[MatchResult]
+) -> PairReport:
+    """
+    Returns the report of the pair, from the results of all of its matches.
+    """
+    strat1_name = strat1_cls.name
+    strat2_name = strat2_cls.name
+    lines: List[str] = []
+    disqualified: List[str] = []
+    times: List[Tuple[str, float, int, float]] = []
+    lines.append(f"{strat1_name}  VS  {strat2_name}\n")
+    if write_moves:
+        lines.append(pair_results[0].moves1 + '\n')
+        lines.append(pair_results[0].moves2 + '\n')
+    round_score1, round_score2 = average(pair_results)
+    interval1 = interval2 = ''
+    if confidence_width and len(pair_results) > 1:
+        half_width1, half_width2 = confidence(pair_results)
+        rounds = len(pair_results)
+        interval1 = f" ± {half_width1} ({rounds} rounds)"
+        interval2 = f" ± {half_width2} ({rounds} rounds)"
+    nl = max(len(strat1_name), len(strat2_name))
+    lines.append(f"{strat1_name:>{nl}} score: {round_score1}{interval1}\n")
+    lines.append(f"{strat2_name:>{nl}} score: {round_score2}{interval2}\n")
+    for side, strat_cls in ((1, strat1_cls), (2, strat2_cls)):
+        name = strat_cls.name
+        forfeits = sum(result.forfeit == side for result in pair_results)
+        if forfeits:
+            if time_limit_action == "disqualify":
+                disqualified.append(name)
+            # hosted matches aren't timed, so they can only be forfeited by failing
+            reason = "exceeding the time limit"
+            if hosting.hosted(strat_cls):
+                reason = "failing in its host"
+            lines.append(
+                f"{name:>{nl}} forfeited {forfeits}/{len(pair_results)} matches, {reason}\n"
             )
-        result2: int = strat2.play(history2)
-        if isinstance(result2, bool):
-            result2 = int(result2)
-        if not (isinstance(result2, int) and 0 <= result2 <= 1):
-            raise RuntimeError(
-                f"Strategy {strat2_cls.name} returned an invalid move: {result2}"
+    timed = [result.timing for result in pair_results if result.timing is not None]
+    if profile and timed:
+        moves = sum(timing.moves for timing in timed)
+        for name, spent, longest in (
+            (
+                strat1_name,
+                sum(timing.time1 for timing in timed),
+                max(timing.longest1 for timing in timed),
+            ),
+            (
+                strat2_name,
+                sum(timing.time2 for timing in timed),
+                max(timing.longest2 for timing in timed),
+            ),
+        ):
+            lines.append(
+                f"{name:>{nl}} time: {spent / moves * 1e6:.3f} µs per move,"
+                f" {spent * 1e3:.3f} ms in total (longest move: {longest * 1e6:.3f} µs)\n"
             )
-        history1.append((result1, result2))
-        history2.append((result2, result1))
-    return history1
+            times.append((name, spent, moves, longest))
+        wall = sum(timing.wall for timing in timed) / len(timed)
+        lines.append(f"{'Match':>{nl}} time: {wall * 1e3:.3f} ms\n")
+    lines.append("\n\n")
+    return PairReport(
+        ''.join(lines), strat1_name, strat2_name, round_score1, round_score2, disqualified, times
+    )
 
 
-# run each strategy against one another
-scores: DefaultDict[str, float] = DefaultDict(float)
-with open("results.txt", "w", encoding="utf8") as file:
-    file.write(f"Round length: {ROUND_LEN}\n\n\n")
+if __name__ == "__main__":
     if not with_stochastic:
         strategies = [s for s in strategies if not s.stochastic]
-    total_matches = comb(len(strategies), 2)
-    for i, (strat1_cls, strat2_cls) in enumerate(combinations(strategies, 2), start=1):
-        print(f"{i}/{total_matches}")
-        strat1_name = strat1_cls.name
-        strat2_name = strat2_cls.name
-        file.write(f"{strat1_name}  VS  {strat2_name}\n")
-        stochastic = strat1_cls.stochastic or strat2_cls.stochastic
-        # stochastic strategies are averaged over multiple rounds
-        # non-stochastic strategies are matched only once
-        round_score1 = round_score2 = 0.0
-        for round in range(ROUNDS if stochastic else 1):
-            # simulate
-            history = match(strat1_cls, strat2_cls)
-            # total up the score
-            score1 = score2 = 0
-            line1 = []
-            line2 = []
-            for move1, move2 in history:
-                line1.append(LETTERS[move1])
-                line2.append(LETTERS[move2])
-                score1 += OUTCOMES[move1][move2]
-                score2 += OUTCOMES[move2][move1]
-            if round == 0:
-                file.write(''.join(line1) + '\n')
-                file.write(''.join(line2) + '\n')
-            round_score1 += score1 / ROUND_LEN
-            round_score2 += score2 / ROUND_LEN
-        if stochastic:
-            round_score1 /= ROUNDS
-            round_score2 /= ROUNDS
-        scores[strat1_name] += round_score1
-        scores[strat2_name] += round_score2
-        nl = max(len(strat1_name), len(strat2_name))
-        file.write(f"{strat1_name:>{nl}} score: {round_score1}\n")
-        file.write(f"{strat2_name:>{nl}} score: {round_score2}\n\n\n")
-    file.write('\n')
-
-
-# Display the average of each strategy
-with open("results.txt", "a", encoding="utf8") as file:
-    file.write("AVERAGE SCORES\n")
-    nw = floor(log10(len(scores))) + 1
-    nl = max(len(name) for name in scores) + 1
-    div = len(scores) - 1
-    for i, (name, score) in enumerate(
-        sorted(scores.items(), key=lambda i: i[1], reverse=True), start=1
-    ):
-        file.write(f"#{i:{nw}} {f'{name}:':{nl}} {score / div}\n")
+    # the pre-flight conformance check, see `conformance.py` for details
+    uncertified = [s.name for s in strategies if not hosting.hosted(s) and not certified(s)]
+    if uncertified:
+        print(f"Failed the conformance check, every move is checked: {', '.join(uncertified)}")
+    pairs = list(combinations(strategies, 2))
+    names = [s.name for s in strategies]
+
+    # the pairs played by this run, by their index among all of the pairs
+    indices = list(range(len(pairs)))
+    output_file = "results.txt"
+    checkpoint_path = checkpoint_file
+    trace_path = trace_file
+    if shard:
+        shard_index, shard_count = shard_spec()
+        indices = shard_pairs(pairs, shard_count)[shard_index - 1]
+        output_file = shard_file(shard_index, shard_count)
+        root, ext = os.path.splitext(checkpoint_file)
+        checkpoint_path = f"{root}-{shard_index}-of-{shard_count}{ext}"
+        root, ext = os.path.splitext(trace_file)
+        trace_path = f"{root}-{shard_index}-of-{shard_count}{ext}"
+    # run each strategy against one another
+    standings = Standings(names)
+    # the number of pairs already written into the output file
+    completed = 0
+    saved: Optional[Checkpoint] = None
+    if resume:
+        saved = checkpoint.load(checkpoint_path)
+        if saved is None:
+            raise RuntimeError(f"There's no checkpoint to resume from in {checkpoint_path}")
+        if saved.strategies != names:
+            raise RuntimeError("The checkpoint was saved with a different set of strategies!")
+        # the remaining matches are played exactly like they would have been
+        ROUND_LEN = saved.round_len
+        SEED = saved.seed
+        completed = saved.completed
+        standings.scores = DefaultDict(float, saved.scores)
+        standings.pair_scores = saved.pair_scores
+        standings.disqualified = set(saved.disqualified)
+        standings.times = saved.times
+        # drop whatever's been written after the checkpoint
+        with open(output_file, "r+b") as output:
+            output.truncate(saved.offset)
+    # drawn in `constants.py` if it isn't set, or restored from the checkpoint
+    assert SEED is not None
+    trace_writer: Optional[TraceWriter] = None
+    if trace_file:
+        trace_writer = TraceWriter(
+            trace_path,
+            ROUND_LEN,
+            SEED,
+            names,
+            len(pairs),
+            None if saved is None else saved.trace_offset,
+        )
+    with open(output_file, "w" if saved is None else "a", encoding="utf8") as file:
+        if saved is None:
+            if shard:
+                # the merge checks that all shards are parts of the same tournament
+                file.write(json.dumps({
+                    "round_len": ROUND_LEN,
+                    "seed": SEED,
+                    "strategies": names,
+                    "pairs": len(pairs),
+                    "shard": shard_index,
+                    "shards": shard_count,
+                }) + '\n')
+            else:
+                file.write(f"Round length: {ROUND_LEN}\n")
+                file.write(f"Seed: {SEED}\n\n\n")
+        total_matches = len(indices)
+        remaining = indices[completed:]
+        for i, (index, pair_results) in enumerate(
+            zip(remaining, play([pairs[index] for index in remaining])), start=completed + 1
+        ):
+            print(f"{i}/{total_matches}")
+            pair_report = report(*pairs[index], pair_results)
+            standings.add(pair_report)
+            if trace_writer is not None:
+                trace_writer.add(index, pair_results)
+            if shard:
+                file.write(json.dumps({"pair": index, **pair_report._asdict()}) + '\n')
+            else:
+                file.write(pair_report.text)
+            if checkpoint_every and i % checkpoint_every == 0 and i < total_matches:
+                # the results have to be on the disk before the checkpoint pointing past them is
+                file.flush()
+                os.fsync(file.fileno())
+                checkpoint.save(checkpoint_path, Checkpoint(
+                    ROUND_LEN,
+                    SEED,
+                    names,
+                    i,
+                    file.tell(),
+                    dict(standings.scores),
+                    standings.pair_scores,
+                    sorted(standings.disqualified),
+                    standings.times,
+                    0 if trace_writer is None else trace_writer.tell(),
+                ))
+        if not shard:
+            file.write('\n')
+    if trace_writer is not None:
+        trace_writer.close()
+
+    if not shard:
+        with open("results.txt", "a", encoding="utf8") as file:
+            standings.write(file)
+
+    # the run is done, there's nothing left to resume
+    if checkpoint_every and os.path.isfile(checkpoint_path):
+        os.remove(checkpoint_path)
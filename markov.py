@@ -0,0 +1,96 @@
+from functools import lru_cache
+from typing import Optional, List, Tuple, Type
+
+from strategy import Strategy, FSMStrategy, MemoryOne
+from constants import OUTCOMES
+
+
+@lru_cache(maxsize=None)
+def memory_one(strat_cls: Type[Strategy]) -> Optional[MemoryOne]:
+    """
+    Returns the memory-one vector of the given strategy, or `None` if it isn't one.
+
+    Strategies have to declare it via `Strategy.memory_one`, unless they play purely
+    by their state machine tables (see `FSMStrategy`). Those are checked exactly instead:
+    they're memory-one if, in every state they can get into, their next move only depends
+    on their own move and the opponent's move in the last round. Outcomes the strategy
+    never gets into are filled with zeros, as they can't affect the result.
+    Anything else could always behave differently later on, so it's never assumed to be one.
+    """
+    if strat_cls.memory_one is not None:
+        return strat_cls.memory_one
+    if not (
+        issubclass(strat_cls, FSMStrategy)
+        and strat_cls.play is FSMStrategy.play
+    ):
+        return None
+    moves, transitions = strat_cls.moves, strat_cls.transitions
+    after: List[List[Optional[int]]] = [[None, None], [None, None]]
+    seen = {strat_cls.initial}
+    pending = [strat_cls.initial]
+    while pending:
+        state = pending.pop()
+        own = moves[state]
+        for opponent_move in (0, 1):
+            next_state = transitions[state][opponent_move]
+            move = moves[next_state]
+            if after[own][opponent_move] is None:
+                after[own][opponent_move] = move
+            elif move != after[own][opponent_move]:
+                return None
+            if next_state not in seen:
+                seen.add(next_state)
+                pending.append(next_state)
+    return (
+        float(moves[strat_cls.initial]),
+        (
+            (float(after[0][0] or 0), float(after[0][1] or 0)),
+            (float(after[1][0] or 0), float(after[1][1] or 0)),
+        ),
+    )
+
+
+def expected_scores(
+    vector1: MemoryOne, vector2: MemoryOne, round_len: int
+) -> Tuple[float, float]:
+    """
+    Returns the expected total scores of a match between two memory-one strategies.
+
+    The match is a Markov chain over the 4 possible outcomes of each round,
+    so instead of sampling it, the probability of each outcome is carried over
+    from one round to the next, adding up the expected score of every round along the way.
+    """
+    first1, after1 = vector1
+    first2, after2 = vector2
+    # dist[move1][move2] is the probability of the round ending up with these moves
+    dist = [
+        [(1 - first1) * (1 - first2), (1 - first1) * first2],
+        [first1 * (1 - first2), first1 * first2],
+    ]
+    score1 = score2 = 0.0
+    for i in range(round_len):
+        round1 = round2 = 0.0
+        for move1 in (0, 1):
+            for move2 in (0, 1):
+                round1 += dist[move1][move2] * OUTCOMES[move1][move2]
+                round2 += dist[move1][move2] * OUTCOMES[move2][move1]
+        new_dist = [[0.0, 0.0], [0.0, 0.0]]
+        for move1 in (0, 1):
+            for move2 in (0, 1):
+                p = dist[move1][move2]
+                if not p:
+                    continue
+                coop1 = after1[move1][move2]
+                coop2 = after2[move2][move1]
+                new_dist[0][0] += p * (1 - coop1) * (1 - coop2)
+                new_dist[0][1] += p * (1 - coop1) * coop2
+                new_dist[1][0] += p * coop1 * (1 - coop2)
+                new_dist[1][1] += p * coop1 * coop2
+        if new_dist == dist:
+            # the chain has settled, every remaining round scores the same
+            remaining = round_len - i
+            return score1 + round1 * remaining, score2 + round2 * remaining
+        score1 += round1
+        score2 += round2
+        dist = new_dist
+    return score1, score2
@@ -0,0 +1,58 @@
+"""
+Merges the partial results of a sharded tournament (see `shard` in `main.py`) into `results.txt`.
+
+The pairs are put back into their original order, and the scores are summed up in that order,
+so the merged `results.txt` is identical to the one a single, unsharded run would write.
+"""
+import glob
+import json
+from typing import Any, Dict, List
+
+from standings import PairReport, Standings
+
+
+# The files holding the partial results of each shard
+shard_files: str = "results-*-of-*.jsonl"
+
+
+if __name__ == "__main__":
+    header: Dict[str, Any] = {}
+    shards: List[int] = []
+    reports: Dict[int, PairReport] = {}
+    for path in sorted(glob.glob(shard_files)):
+        with open(path, encoding="utf8") as file:
+            shard_header = json.loads(file.readline())
+            shard_index = shard_header.pop("shard")
+            if not header:
+                header = shard_header
+            elif shard_header != header:
+                raise RuntimeError(
+                    f"{path} is a part of a different tournament, make sure all shards"
+                    " use the same strategies and `SEED`"
+                )
+            if shard_index in shards:
+                raise RuntimeError(f"Shard {shard_index} is there more than once")
+            shards.append(shard_index)
+            for line in file:
+                entry = json.loads(line)
+                index = entry.pop("pair")
+                reports[index] = PairReport(**entry)
+    if not header:
+        raise RuntimeError(f"There are no shards to merge, matching {shard_files}")
+    missing_shards = sorted(set(range(1, header["shards"] + 1)) - set(shards))
+    if missing_shards:
+        raise RuntimeError(
+            f"Shards {', '.join(map(str, missing_shards))} of {header['shards']} are missing"
+        )
+    missing_pairs = header["pairs"] - len(reports)
+    if missing_pairs:
+        raise RuntimeError(f"{missing_pairs} pairs are missing, some shards didn't finish")
+    standings = Standings(header["strategies"])
+    with open("results.txt", "w", encoding="utf8") as file:
+        file.write(f"Round length: {header['round_len']}\n")
+        file.write(f"Seed: {header['seed']}\n\n\n")
+        for index in range(header["pairs"]):
+            standings.add(reports[index])
+            file.write(reports[index].text)
+        file.write('\n')
+        standings.write(file)
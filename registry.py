@@ -0,0 +1,339 @@
+"""
+An index of all strategies, built by reading their modules instead of importing them.
+
+Every strategy module is parsed once, and what's been found in it is stored in the index file,
+along with the module's modification time. On the following runs, only the modules
+that have changed since then are parsed again, and only the strategies that are actually
+going to play are imported.
+"""
+import os
+import ast
+import json
+import hashlib
+import inspect
+import importlib
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple, Type
+
+import strategy
+from strategy import Strategy, uses_random
+
+
+class StrategyInfo(NamedTuple):
+    """
+    What's known about a strategy, without importing it.
+
+    `stochastic` mirrors `Strategy.stochastic`: it's set if the class (or a strategy it inherits
+    from) uses `Strategy.random`, or if its module binds the `random` name at the top level,
+    unless one of those classes sets the `stochastic` attribute itself.
+    The source hash covers the whole module, so its constants and helpers too,
+    as well as the base classes from `strategy.py` the strategy inherits from,
+    and the strategies it inherits from in other modules.
+    """
+    name: str
+    module: str
+    stochastic: bool
+    source_hash: str
+
+
+# bumped whenever the format of the index changes, to rebuild it
+INDEX_VERSION = 5
+
+# the base classes strategies can inherit from, like `Strategy` or `FSMStrategy`
+BASES = {
+    name
+    for name, obj in vars(strategy).items()
+    if inspect.isclass(obj) and issubclass(obj, Strategy)
+}
+
+
+@lru_cache(maxsize=None)
+def base_source(base: Type[Strategy]) -> str:
+    """
+    Returns the source of the given base class, along with the source of the base classes
+    it inherits from, short of `Strategy` itself.
+    """
+    return ''.join(
+        inspect.getsource(cls)
+        for cls in base.__mro__
+        if isinstance(cls, type) and issubclass(cls, Strategy) and cls is not Strategy
+    )
+
+
+def _bases_hash() -> str:
+    """
+    Returns a hash of the source of all base classes, so that the index is rebuilt
+    once any of them changes.
+    """
+    digest = hashlib.sha256()
+    for name in sorted(BASES):
+        digest.update(base_source(getattr(strategy, name)).encode("utf8"))
+    return digest.hexdigest()
+
+
+# what subclasses inherit from a strategy: its `stochastic` override, whether it uses
+# `Strategy.random`, and the strategies of other modules it inherits from, as (module, name) pairs
+Inherited = Tuple[Optional[bool], bool, List[Tuple[str, str]]]
+
+# strategies that have been indexed, keyed by (module, name)
+_indexed: Dict[Tuple[str, str], StrategyInfo] = {}
+
+
+def _top_level(tree: ast.Module) -> List[ast.AST]:
+    """
+    Returns the nodes executed when the module is imported, skipping the bodies
+    of functions and classes.
+    """
+    nodes: List[ast.AST] = []
+    pending: List[ast.AST] = list(tree.body)
+    while pending:
+        node = pending.pop()
+        nodes.append(node)
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            pending.extend(ast.iter_child_nodes(node))
+    return nodes
+
+
+def _binds_random(tree: ast.Module) -> bool:
+    """
+    Returns `True` if the `random` name ends up in the module's dictionary.
+    """
+    for node in _top_level(tree):
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                if (alias.asname or alias.name.split('.')[0]) == "random":
+                    return True
+        elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            if node.id == "random":
+                return True
+    return False
+
+
+def _stochastic_override(node: ast.ClassDef) -> Optional[bool]:
+    """
+    Returns the value the class body sets `stochastic` to, if it sets it to a constant.
+    """
+    for statement in node.body:
+        if isinstance(statement, ast.Assign):
+            targets = statement.targets
+            value = statement.value
+        elif isinstance(statement, ast.AnnAssign) and statement.value is not None:
+            targets = [statement.target]
+            value = statement.value
+        else:
+            continue
+        for target in targets:
+            if isinstance(target, ast.Name) and target.id == "stochastic":
+                if isinstance(value, ast.Constant):
+                    return bool(value.value)
+    return None
+
+
+def _imported(
+    tree: ast.Module, package: str
+) -> Tuple[Dict[str, Tuple[str, str]], Dict[str, str]]:
+    """
+    Returns what the module imports from the other modules of its package: the imported
+    names, mapped to the module and the name within it, and the imported modules,
+    mapped to their full names.
+    """
+    names: Dict[str, Tuple[str, str]] = {}
+    modules: Dict[str, str] = {}
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and node.module is not None:
+            if node.level == 1:
+                module = f"{package}.{node.module}"
+            elif node.level == 0 and node.module.startswith(f"{package}."):
+                module = node.module
+            else:
+                continue
+            for alias in node.names:
+                names[alias.asname or alias.name] = (module, alias.name)
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname is not None and alias.name.startswith(f"{package}."):
+                    modules[alias.asname] = alias.name
+    return names, modules
+
+
+def scan(path: str, module: str) -> Tuple[List[StrategyInfo], Dict[str, Inherited]]:
+    """
+    Returns all strategies defined in the given module file, in the order they're defined,
+    along with what their subclasses inherit from them.
+
+    Strategies inheriting from strategies of other modules have only this module covered
+    by their source hash and `stochastic` here, see `_resolve` for the rest.
+    """
+    with open(path, encoding="utf8") as file:
+        source = file.read()
+    tree = ast.parse(source, path)
+    binds_random = _binds_random(tree)
+    imported_names, imported_modules = _imported(tree, module.rpartition('.')[0])
+    found: List[StrategyInfo] = []
+    inherited: Dict[str, Inherited] = {}
+    # the base classes from `strategy.py` of every strategy class found so far
+    externals: Dict[str, Set[str]] = {}
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        bases: List[str] = []
+        # the strategies of other modules it inherits from, as (module, name) pairs
+        parents: List[Tuple[str, str]] = []
+        for base_node in node.bases:
+            if isinstance(base_node, ast.Name):
+                if base_node.id in imported_names and base_node.id not in externals:
+                    parents.append(imported_names[base_node.id])
+                else:
+                    bases.append(base_node.id)
+            elif isinstance(base_node, ast.Attribute):
+                value = base_node.value
+                if isinstance(value, ast.Name) and value.id in imported_modules:
+                    parents.append((imported_modules[value.id], base_node.attr))
+                else:
+                    bases.append(base_node.attr)
+        if not parents and not any(base in BASES or base in externals for base in bases):
+            continue
+        override = _stochastic_override(node)
+        random_used = uses_random(node)
+        external = {base for base in bases if base in BASES and base not in externals}
+        for base in bases:
+            if base in externals:
+                base_override, base_random_used, base_parents = inherited[base]
+                external |= externals[base]
+                random_used |= base_random_used
+                parents.extend(base_parents)
+                if override is None:
+                    override = base_override
+        externals[node.name] = external
+        inherited[node.name] = (override, random_used, parents)
+        # the strategies of a module are told apart by their names
+        digest = hashlib.sha256(node.name.encode("utf8"))
+        digest.update(source.encode("utf8"))
+        for base in sorted(external):
+            digest.update(base_source(getattr(strategy, base)).encode("utf8"))
+        stochastic = binds_random or random_used if override is None else override
+        found.append(StrategyInfo(node.name, module, stochastic, digest.hexdigest()))
+    return found, inherited
+
+
+def _resolve(
+    info: StrategyInfo,
+    modules: Dict[str, Any],
+    resolved: Dict[Tuple[str, str], Tuple[StrategyInfo, Optional[bool], bool]],
+) -> Tuple[StrategyInfo, Optional[bool], bool]:
+    """
+    Returns the strategy, with the strategies it inherits from in other modules accounted for,
+    along with its `stochastic` override and whether it uses `Strategy.random`.
+
+    Its source hash then covers those strategies too, and its `stochastic` is set
+    if any of them uses `Strategy.random`, unless any of them sets the `stochastic` attribute.
+    """
+    key = (info.module, info.name)
+    if key in resolved:
+        return resolved[key]
+    entry = modules[info.module]
+    override, random_used, parents = entry["inherited"][info.name]
+    if not parents:
+        resolved[key] = (info, override, random_used)
+        return resolved[key]
+    digest = hashlib.sha256(info.source_hash.encode("utf8"))
+    for parent_module, parent_name in parents:
+        parent_entry = modules.get(parent_module)
+        if parent_entry is None or parent_name not in parent_entry["inherited"]:
+            raise RuntimeError(
+                f"{info.name} inherits from {parent_name} in {parent_module}, "
+                "which isn't an indexed strategy!"
+            )
+        parent_info = next(
+            StrategyInfo(*fields)
+            for fields in parent_entry["strategies"]
+            if fields[0] == parent_name
+        )
+        parent_info, parent_override, parent_random_used = _resolve(
+            parent_info, modules, resolved
+        )
+        digest.update(parent_info.source_hash.encode("utf8"))
+        random_used |= parent_random_used
+        if override is None:
+            override = parent_override
+    # without an override of its own, it's stochastic here if the module binds `random`,
+    # or the strategy uses `Strategy.random` itself
+    stochastic = info.stochastic or random_used if override is None else override
+    resolved[key] = (
+        info._replace(stochastic=stochastic, source_hash=digest.hexdigest()),
+        override,
+        random_used,
+    )
+    return resolved[key]
+
+
+def index(directory: str = "strategies", index_file: str = '') -> List[StrategyInfo]:
+    """
+    Returns all strategies defined in the modules of the given directory.
+
+    The modules that haven't changed since the index file was last written are not parsed again.
+    Use an empty string for the index file, to always parse all of them.
+    """
+    stored: Dict[str, Any] = {}
+    bases_hash = _bases_hash()
+    if index_file and os.path.isfile(index_file):
+        with open(index_file, encoding="utf8") as file:
+            data = json.load(file)
+        # the source hashes cover the base classes, so they all change along with them
+        if data.get("version") == INDEX_VERSION and data.get("bases") == bases_hash:
+            stored = data["modules"]
+    modules: Dict[str, Any] = {}
+    changed = False
+    for filename in os.listdir(directory):
+        if not filename.endswith(".py"):
+            continue
+        path = os.path.join(directory, filename)
+        stat = os.stat(path)
+        entry = stored.get(filename)
+        if entry is None or entry["mtime"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+            found, inherited = scan(path, f"{directory}.{filename[:-3]}")
+            entry = {
+                "mtime": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "strategies": [list(info) for info in found],
+                "inherited": inherited,
+            }
+            changed = True
+        modules[filename] = entry
+    # strategies inheriting from the strategies of other modules are resolved once all of them
+    # have been found, so that they're kept up to date even if only the other module changes
+    by_module = {f"{directory}.{filename[:-3]}": entry for filename, entry in modules.items()}
+    resolved: Dict[Tuple[str, str], Tuple[StrategyInfo, Optional[bool], bool]] = {}
+    strategies: List[StrategyInfo] = []
+    names: Set[str] = set()
+    for entry in modules.values():
+        for fields in entry["strategies"]:
+            info, _, _ = _resolve(StrategyInfo(*fields), by_module, resolved)
+            if info.name in names:
+                raise RuntimeError(f"{info.name} strategy already exists!")
+            names.add(info.name)
+            strategies.append(info)
+            _indexed[(info.module, info.name)] = info
+    if index_file and (changed or modules.keys() != stored.keys()):
+        with open(index_file, "w", encoding="utf8") as file:
+            json.dump(
+                {"version": INDEX_VERSION, "bases": bases_hash, "modules": modules}, file
+            )
+    return strategies
+
+
+def load(info: StrategyInfo) -> Type[Strategy]:
+    """
+    Imports the given strategy.
+    """
+    strat_cls = getattr(importlib.import_module(info.module), info.name)
+    if not (isinstance(strat_cls, type) and issubclass(strat_cls, Strategy)):
+        raise RuntimeError(f"{info.name} in {info.module} isn't a strategy!")
+    return strat_cls
+
+
+def indexed(strat_cls: Type[Strategy]) -> Optional[StrategyInfo]:
+    """
+    Returns what's been indexed about the given strategy, or `None` if it hasn't been.
+    """
+    return _indexed.get((strat_cls.__module__, strat_cls.__name__))
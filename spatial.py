@@ -0,0 +1,117 @@
+"""
+Spatial tournament: strategies occupy the cells of a 2-D grid, playing their neighbours.
+
+The grid is a compact array of strategy indices, wrapping around at the edges.
+Neighbour payoffs are looked up in the pairwise payoff matrix, built once from the round-robin,
+so every generation is just a handful of vectorized array operations over the whole grid,
+no matter how large it is. Requires NumPy.
+"""
+from math import floor, log10
+from typing import List, Tuple
+
+import numpy as np
+
+from constants import ROUND_LEN, SEED
+from ecology import payoff_matrix
+from main import strategies, with_stochastic
+
+
+# The size of the grid, as (height, width)
+grid_size: Tuple[int, int] = (1000, 1000)
+# The neighbourhood each cell plays against:
+# • "moore" - the 8 surrounding cells
+# • "von_neumann" - the 4 orthogonally adjacent cells
+neighbourhood: str = "moore"
+# The update rule used each generation:
+# • "imitation" - every cell adopts the strategy of its best scoring neighbour,
+#   if it scored better than the cell itself
+# • "moran" - a random `update_rate` share of cells die, and are replaced by the strategy
+#   of one of their neighbours, chosen with probability proportional to their payoff
+update: str = "imitation"
+# The share of cells updated each generation by the "moran" update rule
+update_rate: float = 0.1
+# The number of generations to simulate
+generations: int = 100
+# The seed used for the initial grid and the "moran" update rule, for reproducibility
+seed: int = 0
+
+
+def offsets() -> List[Tuple[int, int]]:
+    """
+    Returns the (row, column) offsets of the neighbouring cells.
+    """
+    if neighbourhood == "moore":
+        return [(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx]
+    elif neighbourhood == "von_neumann":
+        return [(-1, 0), (0, -1), (0, 1), (1, 0)]
+    raise RuntimeError(f"Unknown neighbourhood: {neighbourhood}")
+
+
+def neighbours(grid: np.ndarray) -> np.ndarray:
+    """
+    Returns the neighbours of every cell, stacked along the first axis.
+    """
+    return np.stack([np.roll(grid, (-dy, -dx), axis=(0, 1)) for dy, dx in offsets()])
+
+
+def payoffs(matrix: np.ndarray, grid: np.ndarray) -> np.ndarray:
+    """
+    Returns the total payoff of every cell, from playing all of its neighbours.
+    """
+    total = np.zeros(grid.shape, dtype=matrix.dtype)
+    for neighbour in neighbours(grid):
+        total += matrix[grid, neighbour]
+    return total
+
+
+def step(matrix: np.ndarray, grid: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """
+    Returns the grid of the next generation.
+    """
+    fitness = payoffs(matrix, grid)
+    neighbour_grids = neighbours(grid)
+    neighbour_fitness = neighbours(fitness)
+    if update == "imitation":
+        best = neighbour_fitness.argmax(axis=0)
+        best_fitness = np.take_along_axis(neighbour_fitness, best[None], axis=0)[0]
+        best_grid = np.take_along_axis(neighbour_grids, best[None], axis=0)[0]
+        return np.where(best_fitness > fitness, best_grid, grid)
+    elif update == "moran":
+        # pick a neighbour of every cell, with probability proportional to its payoff
+        cumulative = np.cumsum(neighbour_fitness, axis=0)
+        threshold = rng.random(grid.shape, dtype=cumulative.dtype) * cumulative[-1]
+        chosen = np.minimum((cumulative < threshold[None]).sum(axis=0), len(cumulative) - 1)
+        chosen_grid = np.take_along_axis(neighbour_grids, chosen[None], axis=0)[0]
+        dying = rng.random(grid.shape) < update_rate
+        return np.where(dying, chosen_grid, grid)
+    raise RuntimeError(f"Unknown update rule: {update}")
+
+
+if __name__ == "__main__":
+    if not with_stochastic:
+        strategies = [s for s in strategies if not s.stochastic]
+    rng = np.random.default_rng(seed)
+    # payoffs are kept in single precision, as they're summed up for every cell
+    matrix = payoff_matrix(strategies).astype(np.float32)
+    grid = rng.integers(0, len(strategies), grid_size, dtype=np.uint16)
+    with open("spatial.csv", "w", encoding="utf8") as file:
+        file.write(','.join(["generation", *(s.name for s in strategies)]) + '\n')
+        for generation in range(generations + 1):
+            if generation:
+                grid = step(matrix, grid, rng)
+            counts = np.bincount(grid.ravel(), minlength=len(strategies))
+            file.write(','.join([str(generation), *map(str, counts.tolist())]) + '\n')
+    # the final grid, for visualizing
+    np.save("spatial.npy", grid)
+    with open("spatial.txt", "w", encoding="utf8") as file:
+        file.write(f"Round length: {ROUND_LEN}\n")
+        file.write(f"Seed: {SEED}\n")
+        file.write(f"Grid size: {grid_size[0]}x{grid_size[1]}\n")
+        file.write(f"Neighbourhood: {neighbourhood}\n")
+        file.write(f"Update rule: {update}\n")
+        file.write(f"Generations: {generations}\n\n\n")
+        file.write("FINAL CELL COUNTS\n")
+        nw = floor(log10(len(strategies))) + 1
+        nl = max(len(s.name) for s in strategies) + 1
+        for i, n in enumerate(np.argsort(-counts, kind="stable"), start=1):
+            file.write(f"#{i:{nw}} {f'{strategies[n].name}:':{nl}} {counts[n]}\n")
@@ -0,0 +1,101 @@
+"""
+The report of every pair of strategies, and the standings accumulated from them.
+
+Kept apart from `main.py`, so that merging the results of a sharded tournament
+doesn't have to load any of the strategies.
+"""
+from math import floor, log10
+from typing import DefaultDict, Dict, List, NamedTuple, Set, TextIO, Tuple
+
+
+class PairReport(NamedTuple):
+    """
+    Everything a pair of strategies contributes to `results.txt` and to the rankings.
+    """
+    # the pair's part of `results.txt`
+    text: str
+    strat1_name: str
+    strat2_name: str
+    score1: float
+    score2: float
+    # the strategies to be disqualified for exceeding the time limits
+    disqualified: List[str]
+    # the time spent in `play`, the number of moves and the longest move, of the timed strategies
+    times: List[Tuple[str, float, int, float]]
+
+
+class Standings:
+    """
+    The scores, disqualifications and times, accumulated over the reports of all pairs.
+
+    Reports have to be added in the order of the pairs, so that the scores are summed up
+    in the exact same order every time.
+    """
+    def __init__(self, names: List[str]):
+        # the names of all strategies, in order
+        self.names = names
+        self.scores: DefaultDict[str, float] = DefaultDict(float)
+        # the scores of every pair, to rank them again without the disqualified strategies
+        self.pair_scores: List[Tuple[str, str, float, float]] = []
+        self.disqualified: Set[str] = set()
+        # the total time spent in each strategy's `play`, its number of moves,
+        # and its longest move
+        self.times: Dict[str, Tuple[float, int, float]] = {}
+
+    def add(self, pair_report: PairReport) -> None:
+        self.scores[pair_report.strat1_name] += pair_report.score1
+        self.scores[pair_report.strat2_name] += pair_report.score2
+        self.pair_scores.append((
+            pair_report.strat1_name,
+            pair_report.strat2_name,
+            pair_report.score1,
+            pair_report.score2,
+        ))
+        self.disqualified.update(pair_report.disqualified)
+        for name, spent, moves, longest in pair_report.times:
+            total_spent, total_moves, total_longest = self.times.get(name, (0.0, 0, 0.0))
+            self.times[name] = (
+                total_spent + spent, total_moves + moves, max(total_longest, longest)
+            )
+
+    def write(self, file: TextIO) -> None:
+        """
+        Writes the rankings, the disqualified strategies and the strategy times into the file.
+        """
+        scores = self.scores
+        if self.disqualified:
+            # rank the rest as if the disqualified strategies never took part
+            scores = DefaultDict(float, {
+                name: 0.0 for name in self.names if name not in self.disqualified
+            })
+            for strat1_name, strat2_name, round_score1, round_score2 in self.pair_scores:
+                if strat1_name not in self.disqualified and strat2_name not in self.disqualified:
+                    scores[strat1_name] += round_score1
+                    scores[strat2_name] += round_score2
+        # Display the average of each strategy
+        file.write("AVERAGE SCORES\n")
+        nw = floor(log10(max(len(scores), 1))) + 1
+        nl = max((len(name) for name in scores), default=0) + 1
+        div = max(len(scores) - 1, 1)
+        for i, (name, score) in enumerate(
+            sorted(scores.items(), key=lambda i: i[1], reverse=True), start=1
+        ):
+            file.write(f"#{i:{nw}} {f'{name}:':{nl}} {score / div}\n")
+        if self.disqualified:
+            file.write("\n\nDISQUALIFIED\n")
+            for name in self.names:
+                if name in self.disqualified:
+                    file.write(f"{name}\n")
+        if self.times:
+            # Display the time each strategy spent making its moves, slowest first
+            file.write("\n\nSTRATEGY TIMES\n")
+            nw = floor(log10(len(self.times))) + 1
+            nl = max(len(name) for name in self.times) + 1
+            for i, (name, (spent, moves, longest)) in enumerate(
+                sorted(self.times.items(), key=lambda i: i[1][0], reverse=True), start=1
+            ):
+                file.write(
+                    f"#{i:{nw}} {f'{name}:':{nl}} {spent:.6f} s in total,"
+                    f" {spent / moves * 1e6:.3f} µs per move"
+                    f" (longest move: {longest * 1e6:.3f} µs)\n"
+                )
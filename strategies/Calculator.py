@@ -9,16 +9,17 @@ class Calculator(Strategy):
     This usually ends up behaving like Tit for Tat,
     but is more self-aware of it's own status.
     """
+    memory = 1
+
     def __init__(self):
-        self.own_score = 0
-        self.opponent_score = 0
+        # own score minus the opponent's score
+        self.lead = 0
 
     def play(self, history: History):
         if not history:
             return 1
         own, opn = history[-1]
-        self.own_score += self.OUTCOMES[own][opn]
-        self.opponent_score += self.OUTCOMES[opn][own]
-        if self.own_score < self.opponent_score:
+        self.lead += self.OUTCOMES[own][opn] - self.OUTCOMES[opn][own]
+        if self.lead < 0:
             return 0
         return 1
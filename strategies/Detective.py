@@ -12,6 +12,8 @@ class Detective(Strategy):
     - "Elementary, my dear Watson."
 
     """
+    memory = 5
+
     def __init__(self):
         self.moves = (1, 0, 1, 1)
         self.exploit = False
@@ -22,7 +24,7 @@ class Detective(Strategy):
         l = len(history)
         if l < len(self.moves):
             return self.moves[l]
-        if l == len(self.moves) and all(m[1] == 1 for m in history):
+        if l == len(self.moves) and history.opponent_cooperations == l:
             # opponent never cheated back - exploit them
             self.exploit = True
             return 0
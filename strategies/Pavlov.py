@@ -1,20 +1,14 @@
-from strategy import Strategy
+from strategy import FSMStrategy
 
 
-class Pavlov(Strategy):
+class Pavlov(FSMStrategy):
     """
     Start by cooperating.
 
     If your opponent cooperates, just repeat your last move.
     If your opponent defects, do the opposite move of your last.
     """
-    def play(self, history):
-        if not history:
-            return 1
-        last = history[-1]
-        if last[1] == 1:
-            # repeat
-            return last[0]
-        else:
-            # opposite
-            return 1 - last[0]
+    # the state is the last move: the opposite one on defection, the same one on cooperation
+    moves = (0, 1)
+    transitions = ((1, 0), (0, 1))
+    initial = 1
@@ -1,35 +1,37 @@
-from strategy import Strategy
+from strategy import FSMStrategy
 
 
-class AlwaysCooperate(Strategy):
+class AlwaysCooperate(FSMStrategy):
     """
     Always cooperates.
     """
-    def play(self, history):
-        return 1
+    memory = 0
+    moves = (1,)
+    transitions = ((0, 0),)
 
 
-class AlwaysDefect(Strategy):
+class AlwaysDefect(FSMStrategy):
     """
     Always defects.
     """
-    def play(self, history):
-        return 0
+    memory = 0
+    moves = (0,)
+    transitions = ((0, 0),)
 
 
-class Alternator(Strategy):
+class Alternator(FSMStrategy):
     """
     Alternates beteween cooperating and defecting.
     Starts by cooperating.
     """
-    def play(self, history):
-        return 1 - len(history) % 2
+    moves = (1, 0)
+    transitions = ((1, 1), (0, 0))
 
 
-class ReverseAlternator(Strategy):
+class ReverseAlternator(FSMStrategy):
     """
     Alternates beteween cooperating and defecting.
     Starts by defecting.
     """
-    def play(self, history):
-        return len(history) % 2
+    moves = (0, 1)
+    transitions = ((1, 1), (0, 0))
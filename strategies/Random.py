@@ -1,8 +1,10 @@
 """
-If it uses the `random` library, it belongs here.
-"""
+If it's random, it belongs here.
 
-import random
+Note: The strategies here draw their random numbers from `Strategy.random`,
+to keep the runs reproducible. Using it is what marks them as stochastic,
+they don't need to import the `random` module for that.
+"""
 
 from strategy import Strategy
 
@@ -11,51 +13,80 @@ class Random(Strategy):
     """
     50/50 on whether it cooperates or defects.
     """
+    memory_one = (0.5, ((0.5, 0.5), (0.5, 0.5)))
+
     def play(self, history):
-        return random.randint(0, 1)
+        return self.random.randint(0, 1)
+
+    def play_batch(self, history, rng):
+        return rng.integers(0, 2, history.games)
 
 
 class CooperateSometimesDefect(Strategy):
     """
     Usually cooperates, but sometimes defects.
     """
+    memory_one = (0.9, ((0.9, 0.9), (0.9, 0.9)))
+
     def play(self, history):
-        return random.choices((0, 1), weights=(0.1, 0.9), k=1)[0]
+        return self.random.choices((0, 1), weights=(0.1, 0.9), k=1)[0]
+
+    def play_batch(self, history, rng):
+        return rng.random(history.games) >= 0.1
 
 
 class DefectSometimesCooperate(Strategy):
     """
     Usually defects, but sometimes cooperates.
     """
+    memory_one = (0.1, ((0.1, 0.1), (0.1, 0.1)))
+
     def play(self, history):
-        return random.choices((0, 1), weights=(0.9, 0.1), k=1)[0]
+        return self.random.choices((0, 1), weights=(0.9, 0.1), k=1)[0]
+
+    def play_batch(self, history, rng):
+        return rng.random(history.games) >= 0.9
 
 
 class SelfishTFT(Strategy):
     """
     Classic Tit for Tat, but it defects 10% of the time, even when the opponent cooperates.
     """
+    memory_one = (1.0, ((0.0, 0.9), (0.0, 0.9)))
+
     def play(self, history):
         if not history:
             return 1
         if history[-1][1] == 0:
             return 0
-        if random.random() <= 0.1:
+        if self.random.random() <= 0.1:
             # 10% chance to defect for cooperation, once in a while
             return 0
         return 1
 
+    def play_batch(self, history, rng):
+        if not history:
+            return 1
+        return history.opponent[:, -1] & (rng.random(history.games) > 0.1)
+
 
 class GenerousTFT(Strategy):
     """
     Classic Tit for Tat, but it cooperates 10% of the time, even when the opponent defects.
     """
+    memory_one = (1.0, ((0.1, 1.0), (0.1, 1.0)))
+
     def play(self, history):
         if not history:
             return 1
         if history[-1][1] == 1:
             return 1
-        if random.random() <= 0.1:
+        if self.random.random() <= 0.1:
             # 10% chance to cooperate for defection, once in a while
             return 1
         return 0
+
+    def play_batch(self, history, rng):
+        if not history:
+            return 1
+        return history.opponent[:, -1] | (rng.random(history.games) <= 0.1)
@@ -7,6 +7,8 @@ class Tester(Strategy):
     If not, it repeats the cycle.
     If yes, or the opponent's first move was to defect too, it becomes Tit for Tat.
     """
+    memory = 3
+
     def __init__(self):
         self.repeat = True
 
@@ -14,6 +16,9 @@ class Tester(Strategy):
         if self.repeat:
             l = len(history)
             if l in (1, 2):
-                self.repeat = not any(m[1] == 0 for m in history[-2:])
-            return l % 2
+                self.repeat = history.opponent_cooperations == l
+            if not history:
+                return 0
+            # keep alternating
+            return 1 - history[-1][0]
         return history[-1][1]
@@ -1,62 +1,35 @@
-from strategy import Strategy
+from strategy import Strategy, FSMStrategy
 
 
-class GrimmTrigger(Strategy):
+class GrimmTrigger(FSMStrategy):
     """
     Start by cooperating, and repeat it until the opponent defects, at which point you get "angry"
     and defect for the rest of the round.
     """
-    def __init__(self):
-        self.angry = False
-
-    def play(self, history):
-        if self.angry:
-            return 0
-        if not history:
-            return 1
-        if history[-1][1] == 0:
-            # our opponent defected - RAGE!
-            self.angry = True
-            return 0
-        return 1
+    # angry, calm
+    moves = (0, 1)
+    transitions = ((0, 0), (0, 1))
+    initial = 1
 
 
-class DelayedGrimmTrigger(Strategy):
+class DelayedGrimmTrigger(FSMStrategy):
     """
     Same as GrimmTrigger, but requires two defections - forgives the first one.
     """
-    def __init__(self):
-        self.defections = 0
-
-    def play(self, history):
-        if not history:
-            return 1
-        if history[-1][1] == 0:
-            # our opponent defected
-            self.defections += 1
-        if self.defections >= 2:
-            return 0
-        return 1
+    # angry, forgave one defection already, calm
+    moves = (0, 1, 1)
+    transitions = ((0, 0), (0, 1), (1, 2))
+    initial = 2
 
 
-class NiceTrigger(Strategy):
+class NiceTrigger(FSMStrategy):
     """
     Start by defecting, and repeat it until the opponent cooperates, at which point you get "nice"
     and cooperate for the rest of the round.
     """
-    def __init__(self):
-        self.nice = False
-
-    def play(self, history):
-        if self.nice:
-            return 1
-        if not history:
-            return 0
-        if history[-1][1] == 1:
-            # our opponent cooperated
-            self.nice = True
-            return 1
-        return 0
+    # not nice yet, nice
+    moves = (0, 1)
+    transitions = ((0, 1), (1, 1))
 
 
 class Grumpy(Strategy):
@@ -65,6 +38,8 @@ class Grumpy(Strategy):
     After enough of them, get "grumpy" and switch to defecting.
     If your opponent decided to cooperate enough times, switch to cooperating again too.
     """
+    memory = 1
+
     def __init__(self):
         self.count = 0
 
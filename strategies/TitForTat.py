@@ -1,91 +1,78 @@
-from strategy import Strategy, History
+from strategy import Strategy, FSMStrategy, History
 
 
-class TitForTat(Strategy):
+class TitForTat(FSMStrategy):
     """
     Classic Tit for Tat. Start by cooperating, then mimic the last opponent's move.
     """
-    def play(self, history: History):
-        if not history:
-            return 1
-        return history[-1][1]
+    # the state is the opponent's last move
+    moves = (0, 1)
+    transitions = ((0, 1), (0, 1))
+    initial = 1
 
 
-class SuspiciousTitForTat(Strategy):
+class SuspiciousTitForTat(FSMStrategy):
     """
     Tit for Tat, but starts by defecting, then mimics the last opponent's move.
     """
-    def play(self, history: History):
-        if not history:
-            return 0
-        return history[-1][1]
+    # the state is the opponent's last move
+    moves = (0, 1)
+    transitions = ((0, 1), (0, 1))
 
 
-class ReverseTitForTat(Strategy):
+class ReverseTitForTat(FSMStrategy):
     """
     Tit for Tat, but starts by defecting, then mimics the reversed last opponent's move.
     """
-    def play(self, history: History):
-        if not history:
-            return 0
-        return 1 - history[-1][1]
+    # the state is the reversed opponent's last move
+    moves = (0, 1)
+    transitions = ((1, 0), (1, 0))
 
 
-class TitFor2Tats(Strategy):
+class TitFor2Tats(FSMStrategy):
     """
     Tit for Tat, but requires two defections before retaliating.
     Also known as Tit for Two Tats.
     """
-    def play(self, history: History):
-        if len(history) < 2:
-            return 1
-        return history[-1][1] + history[-2][1] > 0
+    # opponent cooperated last, opponent defected once, opponent defected twice in a row
+    moves = (1, 1, 0)
+    transitions = ((1, 0), (2, 0), (2, 0))
 
 
-class DelayedTitForTat(Strategy):
+class DelayedTitForTat(FSMStrategy):
     """
     Tit for Tat, but start by cooperating twice, then mimic the 2nd last opponent's move.
     """
-    def play(self, history: History):
-        if len(history) < 2:
-            return 1
-        return history[-2][1]
+    # the state is the opponent's last two moves, 2nd last << 1 | last
+    moves = (0, 0, 1, 1)
+    transitions = ((0, 1), (2, 3), (0, 1), (2, 3))
+    initial = 3
 
 
-class GrimmTitForTat(Strategy):
+class GrimmTitForTat(FSMStrategy):
     """
     Grimm Tit for Tat. Start by cooperating, then mimic the last opponent's move.
 
     If at any point your opponent defects twice in a row,
     get angry and switch to defecting for the rest of the round.
     """
-    def __init__(self):
-        self.angry = False
-
-    def play(self, history: History):
-        if self.angry:
-            return 0
-        if not history:
-            return 1
-        elif len(history) >= 2 and history[-1][1] + history[-2][1] == 0:
-            self.angry = True
-            return 0
-        return history[-1][1]
+    # angry, opponent defected once, opponent cooperated last
+    moves = (0, 0, 1)
+    transitions = ((0, 0), (0, 2), (1, 2))
+    initial = 2
 
 
-class NiceTitForTat(Strategy):
+class NiceTitForTat(FSMStrategy):
     """
     Start by cooperating, then mimic the last opponent's move.
 
     If at any point your opponent defects twice in a row,
     cooperate on the next move to get out of deadlock.
     """
-    def play(self, history: History):
-        if not history:
-            return 1
-        if len(history) >= 2 and history[-1][1] + history[-2][1] == 0:
-            return 1
-        return history[-1][1]
+    # opponent defected twice in a row, opponent defected once, opponent cooperated last
+    moves = (1, 0, 1)
+    transitions = ((0, 2), (0, 2), (1, 2))
+    initial = 2
 
 
 class OmegaTitForTat(Strategy):
@@ -112,6 +99,8 @@ class OmegaTitForTat(Strategy):
 
     For any move not covered by these rules, use classic TFT rules.
     """
+    memory = 3
+
     def __init__(self):
         self.offer_help_1 = True
         self.offer_help_2 = True
@@ -1,11 +1,52 @@
 from __future__ import annotations
 
+import ast
+import inspect
+import textwrap
 import importlib
+from random import Random
 from abc import ABC, abstractmethod
-from typing import Union, List, Tuple, Literal, Callable
+from typing import Union, Optional, List, Tuple, Literal, Callable, Any, TYPE_CHECKING
 
+from history import History
 
-History = List[Tuple[int, int]]
+if TYPE_CHECKING:
+    from batch import BatchHistory
+
+
+# The probability of cooperating on the first move, followed by the probabilities of cooperating
+# after each of the last round's outcomes, indexed like OUTCOMES: [own_move][opponent_move]
+MemoryOne = Tuple[float, Tuple[Tuple[float, float], Tuple[float, float]]]
+
+
+def uses_random(node: ast.AST) -> bool:
+    """
+    Returns `True` if the given class definition uses `self.random`, `cls.random`
+    or `type(self).random`, which means the strategy is stochastic.
+    """
+    return any(
+        isinstance(child, ast.Attribute)
+        and child.attr == "random"
+        and (
+            isinstance(child.value, ast.Name) and child.value.id in ("self", "cls")
+            or isinstance(child.value, ast.Call)
+            and isinstance(child.value.func, ast.Name)
+            and child.value.func.id == "type"
+        )
+        for child in ast.walk(node)
+    )
+
+
+def _uses_random(strat_cls: type) -> bool:
+    """
+    Returns `True` if the class itself uses `Strategy.random`, if its source is available.
+    """
+    try:
+        source = textwrap.dedent(inspect.getsource(strat_cls))
+    except (OSError, TypeError):
+        # defined dynamically, like the evolved strategies
+        return False
+    return uses_random(ast.parse(source))
 
 
 class classproperty(property):
@@ -28,7 +69,13 @@ class Strategy(ABC):
         (both_defected, opponent_cooperated_you_defected),
         (opponent_defected_you_cooperated, both_cooperateed),
     )
+    • Strategy.memory - optional, the number of the last rounds your strategy looks at.
+    • Strategy.memory_one - optional, the probabilities of your strategy cooperating,
+    if it only ever looks at the last round.
+    • Strategy.random - the random number generator your strategy should use,
+    with the same methods as the `random` module.
     • Strategy.play - this is where you should implement your strategy.
+    • Strategy.play_batch - optional, a vectorized version of `play`, playing many games at once.
 
     It's recomended to utilize only Python's standard library, like `math` and `random`.
     No 3rd party libraries should be required to construct successful strategies.
@@ -37,6 +84,26 @@ class Strategy(ABC):
     stochastic: Union[bool, Callable[[Strategy], bool]]
     # provides access to the game's outcomes
     from constants import OUTCOMES
+    # Set this to the number of the last rounds your strategy looks at, if it has a limit.
+    # The strategy has to behave the same, given the same instance attributes,
+    # for any two histories whose last `memory` rounds are identical (including their length,
+    # when there's fewer rounds than that). This lets matches be fast-forwarded,
+    # and matches between two such strategies keep only those last rounds in memory,
+    # so looking any further back than that may raise an `IndexError`.
+    memory: Optional[int] = None
+    # Set this if your strategy only ever looks at the last round, and doesn't keep any state,
+    # to the probability of it cooperating on the first move, followed by the probabilities
+    # of it cooperating after each of the last round's outcomes, indexed like OUTCOMES:
+    # (first, ((after_DD, after_DC), (after_CD, after_CC))), where the first letter is your move.
+    # This lets matches against other such strategies be evaluated exactly, instead of sampled.
+    # Strategies playing purely by their state machine tables (see `FSMStrategy`) are checked
+    # through those instead, any other ones are only treated as memory-one if they set this.
+    memory_one: Optional[MemoryOne] = None
+    # Stochastic strategies get their own generator for every match, seeded from the master seed,
+    # so that using it (instead of the `random` module) keeps the runs reproducible,
+    # no matter which order the matches are played in, or which process they're played by.
+    # Outside of the matches, this one is shared by all strategies.
+    random: Random = Random()
 
     @classproperty
     def name(cls) -> str:
@@ -50,15 +117,18 @@ class Strategy(ABC):
     @classproperty  # type: ignore[no-redef]
     def stochastic(cls) -> bool:
         """
-        Returns `True` if the `random` module is imported (and presumably used
-        within the strategy), `False` otherwise.
-        This is checked by looking into the module's disctionary where the strategy is defined,
-        and checking for the `random` variable name.
+        Returns `True` if the strategy uses `Strategy.random`, or if the `random` module
+        is imported (and presumably used within the strategy), `False` otherwise.
+        Strategies found by `registry.index` have this read from the index, which has it
+        from their source: any use of `self.random`, `cls.random` or `type(self).random`
+        in the strategy or the strategies it inherits from, or the `random` name being bound
+        at the top level of the module where the strategy is defined. Any other ones,
+        like the evolved strategies, have their source and their module's dictionary
+        checked the same way, if the source is available.
 
         Strategies that are non-deterministic (their next move can be different
-        between instances, despite given identical history), but don't import the `random` module
-        (or import it under a different name), should manually set this to `True`
-        in their body like so:
+        between instances, despite given identical history), but don't do either of those,
+        should manually set this to `True` in their body like so:
 
         .. codeblock:: py
 
@@ -67,16 +137,41 @@ class Strategy(ABC):
 
         .. warning::
 
-            Because this checks for the import alone, subclasses defined in modules that
-            do import the `random` module, bot don't use it, will end up
-            having this set incorrectly. To avoid this, please keep stochastic
-            and non-stochastic strategies in separate modules:
-            one module which does import `random`, and one which does not.
+            Because the `random` import applies to the whole module, deterministic strategies
+            defined in modules that do import the `random` module will end up having this
+            set incorrectly. To avoid this, please keep them in separate modules,
+            use `Strategy.random` instead of the `random` module, or set this to `False`.
+
+        :type: bool
+        """
+        # resolved once per class, as it's either looked up or parsed out of the source
+        resolved = cls.__dict__.get("_stochastic")  # type: ignore[attr-defined]
+        if resolved is None:
+            # imported here, as the registry imports this module
+            import registry
+
+            info = registry.indexed(cls)  # type: ignore[arg-type]
+            if info is not None:
+                resolved = info.stochastic
+            else:
+                module = importlib.import_module(cls.__module__)  # type: ignore[attr-defined]
+                resolved = "random" in module.__dict__ or any(
+                    _uses_random(base) for base in cls.__mro__  # type: ignore[attr-defined]
+                    if isinstance(base, type)
+                    and issubclass(base, Strategy)
+                    and base is not Strategy
+                )
+            cls._stochastic = resolved  # type: ignore[attr-defined]
+        return resolved
+
+    @classproperty
+    def vectorized(cls) -> bool:
+        """
+        Returns `True` if the strategy implements `Strategy.play_batch`, `False` otherwise.
 
         :type: bool
         """
-        module = importlib.import_module(cls.__module__)
-        return "random" in module.__dict__
+        return cls.play_batch is not Strategy.play_batch  # type: ignore[attr-defined]
 
     @abstractmethod
     def play(self, history: History) -> Literal[0, 1, False, True]:
@@ -100,13 +195,188 @@ class Strategy(ABC):
                 )
                 last_opponent = history[-1][1]
                 print("This gives you the last move of your opponent.")
+            # these are kept up to date as the match goes, so there's no need to go over it
+            print(f"Your opponent cooperated {history.opponent_cooperations} times so far.")
+            print(f"They've defected the last {history.opponent_defection_streak} times in a row.")
+            own_score, opponent_score = history.scores(self.OUTCOMES)
+            last_three = history.recent(3)  # an index into `LookupStrategy.table`
 
         Arguments
         ---------
-        history : List[Tuple[int, int]]
+        history : History
             The past history of the current round.
-            Each tuple contains (self, other) scores of the past rounds
-            against the same strategy player.
-            The list will be empty during the first round.
+            It behaves like a list of tuples, where each tuple contains (self, other) moves
+            of the past rounds against the same strategy player.
+            Slicing it returns a regular list of these tuples.
+            The history will be empty during the first round.
+            See `History` for the aggregates it keeps track of.
+        """
+        raise NotImplementedError
+
+    def play_batch(self, history: BatchHistory, rng: Any) -> Any:
+        """
+        Optional, vectorized version of `Strategy.play`, used when simulating many repetitions
+        of the same match in lockstep. A single instance plays all of the games at once.
+
+        Subclasses can overwrite this method, to let stochastic matches be simulated
+        in batches much faster. Strategies that don't, fall back to using `Strategy.play`,
+        with one instance per game.
+
+        Arguments
+        ---------
+        history : BatchHistory
+            The past histories of all games. `history.own` and `history.opponent`
+            are NumPy arrays of moves, shaped (games, rounds played so far),
+            `history.games` is the number of games, and `len(history)` is the number
+            of rounds played so far - zero during the first round.
+        rng : numpy.random.Generator
+            The random number generator to use. There's no need to import NumPy yourself.
+
+        Returns
+        -------
+        An array of moves, one for each game, or a single move to be made in all of them.
         """
         raise NotImplementedError
+
+
+class FSMStrategy(Strategy):
+    """
+    A strategy defined by a finite-state machine, instead of code.
+
+    In every state, the strategy makes the move assigned to it, and after every round,
+    it moves on to the next state, depending on the opponent's move in that round.
+    Matches between two such strategies don't need to call `play` at all,
+    as the engine can run the tables of both strategies against each other directly.
+
+    Set these in your subclass:
+
+    • FSMStrategy.moves - the move made in each of the states.
+    • FSMStrategy.transitions - the states to move on to from each of the states,
+    as (after_opponent_defected, after_opponent_cooperated) pairs.
+    • FSMStrategy.initial - optional, the state the strategy starts in, the first one by default.
+
+    For example, this is Tit for Tat, which starts in the cooperating state:
+
+    .. codeblock:: py
+
+        class TitForTat(FSMStrategy):
+            moves = (0, 1)
+            transitions = ((0, 1), (0, 1))
+            initial = 1
+    """
+    moves: Tuple[int, ...]
+    transitions: Tuple[Tuple[int, int], ...]
+    initial: int = 0
+    # the current state, along with the opponent's last move, determines the next move
+    memory = 1
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        moves = getattr(cls, "moves", None)
+        transitions = getattr(cls, "transitions", None)
+        if moves is None or transitions is None:
+            # an intermediate class, the tables are yet to be set
+            return
+        states = len(moves)
+        if not (
+            len(transitions) == states
+            and 0 <= cls.initial < states
+            and all(move in (0, 1) for move in moves)
+            and all(
+                len(transition) == 2 and all(0 <= state < states for state in transition)
+                for transition in transitions
+            )
+        ):
+            raise RuntimeError(f"Strategy {cls.__name__} has an invalid state machine")
+
+    def __init__(self):
+        self.state = self.initial
+
+    def play(self, history: History) -> Literal[0, 1, False, True]:
+        if history:
+            self.state = self.transitions[self.state][history[-1][1]]
+        return self.moves[self.state]  # type: ignore[return-value]
+
+    def play_batch(self, history: BatchHistory, rng: Any) -> Any:
+        # NumPy is already there, as it's needed for batches anyway
+        import numpy as np
+        # a single instance plays all of the games, so it keeps an array of states instead
+        if not history:
+            self.state = np.full(history.games, self.initial)
+        else:
+            self.state = np.asarray(self.transitions)[self.state, history.opponent[:, -1]]
+        return np.asarray(self.moves)[self.state]
+
+
+class LookupStrategy(FSMStrategy):
+    """
+    A strategy defined by a lookup table, mapping the last few rounds to the next move.
+
+    Set these in your subclass:
+
+    • LookupStrategy.opening - the moves made in the first rounds, before there's enough
+    of them to look up. Its length is the number of the last rounds the table looks at.
+    • LookupStrategy.table - the move made after each combination of the last rounds.
+    It's indexed by the moves of these rounds, oldest first, 2 bits for each round:
+    `own_move << 1 | opponent_move`. For 2 rounds, `table[0b1110]` is the move made
+    after both cooperated, and then only you cooperated.
+
+    The table is compiled into a state machine, so that matches against other
+    table-driven strategies run just as fast.
+    """
+    opening: Tuple[int, ...]
+    table: Tuple[int, ...]
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        opening = cls.__dict__.get("opening")
+        table = cls.__dict__.get("table")
+        if opening is not None and table is not None:
+            if not (
+                len(opening) > 0
+                and len(table) == 4 ** len(opening)
+                and all(move in (0, 1) for move in (*opening, *table))
+            ):
+                raise RuntimeError(f"Strategy {cls.__name__} has an invalid lookup table")
+            cls.moves, cls.transitions = cls._compile(opening, table)
+            cls.initial = 0
+        super().__init_subclass__(**kwargs)
+
+    @staticmethod
+    def _compile(
+        opening: Tuple[int, ...], table: Tuple[int, ...]
+    ) -> Tuple[Tuple[int, ...], Tuple[Tuple[int, int], ...]]:
+        """
+        Returns the moves and transitions of the state machine playing the given lookup table.
+
+        The opening rounds get a state for every sequence of the opponent's moves so far,
+        as the strategy's own moves are fixed. These are followed by a state
+        for every entry of the table, its index being the state of the last rounds.
+        """
+        depth = len(opening)
+        # the state of the opening round `k`, with the opponent having played `played` so far
+        offsets = [2 ** k - 1 for k in range(depth)]
+        full = 2 ** depth - 1
+        mask = len(table) - 1
+        moves: List[int] = []
+        transitions: List[Tuple[int, int]] = []
+        for k in range(depth):
+            for played in range(2 ** k):
+                moves.append(opening[k])
+                next_states = []
+                for opponent_move in (0, 1):
+                    played_next = played << 1 | opponent_move
+                    if k + 1 < depth:
+                        next_states.append(offsets[k + 1] + played_next)
+                        continue
+                    key = 0
+                    for i in range(depth):
+                        key = key << 2 | opening[i] << 1 | played_next >> (depth - 1 - i) & 1
+                    next_states.append(full + key)
+                transitions.append((next_states[0], next_states[1]))
+        for key, move in enumerate(table):
+            transitions.append((
+                full + ((key << 2 | move << 1) & mask),
+                full + ((key << 2 | move << 1 | 1) & mask),
+            ))
+            moves.append(move)
+        return tuple(moves), tuple(transitions)
@@ -0,0 +1,226 @@
+"""
+Payoff matrix sweep: how do the rankings change, as the outcomes of the dilemma change?
+
+Every match is simulated only once, with its traces reduced to how many times each outcome
+happened. Since the score is linear in those, every match can then be rescored for thousands
+of candidate payoff matrices at once, as a single matrix product. Only the matches involving
+payoff-sensitive strategies, ones that look at the outcomes themselves, are simulated again
+for every matrix. Requires NumPy.
+"""
+import ast
+import sys
+import inspect
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import combinations
+from math import floor, log10
+from typing import Iterator, List, Set, Tuple, Type
+
+import numpy as np
+
+import constants
+from strategy import Strategy
+from engine import match
+from constants import ROUNDS, ROUND_LEN, SEED
+from main import strategies, with_stochastic
+
+
+# The number of candidate payoff matrices to sweep over
+matrices: int = 1000
+# The range the payoff values are drawn from
+payoff_range: Tuple[float, float] = (0.0, 10.0)
+# The seed used to draw the payoff matrices, for reproducibility
+seed: int = 0
+
+
+Outcomes = Tuple[Tuple[float, float], Tuple[float, float]]
+
+
+def valid_outcomes(outcomes: Outcomes) -> bool:
+    """
+    Returns `True` if the given outcomes meet the conditions described in `constants.py`.
+    """
+    (p, t), (s, r) = outcomes
+    return p > s and t > r and t > p and r > s and r > p
+
+
+def random_outcomes(rng: np.random.Generator, count: int) -> List[Outcomes]:
+    """
+    Draws the given number of random, valid payoff matrices.
+
+    The conditions boil down to T > R > P > S, so four sorted random values are used.
+    """
+    values = np.sort(rng.uniform(*payoff_range, size=(count, 4)), axis=1)
+    candidates: List[Outcomes] = []
+    for s, p, r, t in values.tolist():
+        outcomes = ((p, t), (s, r))
+        if valid_outcomes(outcomes):
+            candidates.append(outcomes)
+    return candidates
+
+
+def _strategy_modules(strat_cls: Type[Strategy]) -> Set[str]:
+    """
+    Returns the names of the modules the strategy, and the strategies it inherits from,
+    are defined in. The base classes from `strategy.py` only provide `Strategy.OUTCOMES`.
+    """
+    return {
+        cls.__module__
+        for cls in strat_cls.__mro__
+        if isinstance(cls, type) and issubclass(cls, Strategy) and cls.__module__ != "strategy"
+    }
+
+
+@lru_cache(maxsize=None)
+def payoff_sensitive(strat_cls: Type[Strategy]) -> bool:
+    """
+    Returns `True` if the module of the strategy, or of any of the strategies it inherits from,
+    refers to `OUTCOMES` anywhere in its source, so its helpers and constants are covered too.
+    """
+    for module_name in _strategy_modules(strat_cls):
+        tree = ast.parse(inspect.getsource(sys.modules[module_name]))
+        for node in ast.walk(tree):
+            if (
+                isinstance(node, ast.Name) and node.id == "OUTCOMES"
+                or isinstance(node, ast.Attribute) and node.attr == "OUTCOMES"
+            ):
+                return True
+    return False
+
+
+@lru_cache(maxsize=None)
+def reads_outcomes_on_import(module_name: str) -> bool:
+    """
+    Returns `True` if the module refers to `OUTCOMES` in the code that runs when it's imported,
+    like module constants or class attributes. Anything computed from them then can't follow
+    the outcomes being swept.
+    """
+    tree = ast.parse(inspect.getsource(sys.modules[module_name]))
+    pending: List[ast.AST] = list(tree.body)
+    while pending:
+        node = pending.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            # only the decorators and the defaults are evaluated, not the body
+            pending.extend(node.decorator_list)
+            pending.extend(node.args.defaults)
+            pending.extend(default for default in node.args.kw_defaults if default is not None)
+            continue
+        if (
+            isinstance(node, ast.Name) and node.id == "OUTCOMES"
+            or isinstance(node, ast.Attribute) and node.attr == "OUTCOMES"
+        ):
+            return True
+        pending.extend(ast.iter_child_nodes(node))
+    return False
+
+
+@contextmanager
+def outcomes_set_to(outcomes: Outcomes, *strat_classes: Type[Strategy]) -> Iterator[None]:
+    """
+    Temporarily changes the outcomes the given strategies see: via `Strategy.OUTCOMES`,
+    `constants.OUTCOMES`, and `OUTCOMES` imported into their modules from `constants`.
+    """
+    original = constants.OUTCOMES
+    modules = [
+        sys.modules[module_name]
+        for strat_cls in strat_classes
+        for module_name in _strategy_modules(strat_cls)
+        if getattr(sys.modules[module_name], "OUTCOMES", None) is original
+    ]
+    Strategy.OUTCOMES = outcomes  # type: ignore[assignment]
+    constants.OUTCOMES = outcomes  # type: ignore[assignment]
+    for module in modules:
+        module.OUTCOMES = outcomes  # type: ignore[attr-defined]
+    try:
+        yield
+    finally:
+        Strategy.OUTCOMES = original
+        constants.OUTCOMES = original
+        for module in modules:
+            module.OUTCOMES = original  # type: ignore[attr-defined]
+
+
+def tally(strat1_cls: Type[Strategy], strat2_cls: Type[Strategy]) -> List[float]:
+    """
+    Simulates the match (averaged over multiple rounds for stochastic strategies),
+    and returns the average share of rounds that ended up with each of the outcomes,
+    flattened as: [both defected, 1st defected, 2nd defected, both cooperated].
+    """
+    rounds = ROUNDS if strat1_cls.stochastic or strat2_cls.stochastic else 1
+    counts = [0.0] * 4
+    for round in range(rounds):
+        (dd, dc), (cd, cc) = match(
+            strat1_cls, strat2_cls, ROUND_LEN, SEED, round, keep=False
+        ).tally()
+        for i, count in enumerate((dd, dc, cd, cc)):
+            counts[i] += count / ROUND_LEN / rounds
+    return counts
+
+
+def sweep(
+    strategies: List[Type[Strategy]], candidates: List[Outcomes]
+) -> np.ndarray:
+    """
+    Returns the average scores of all strategies, for each of the candidate payoff matrices,
+    shaped (strategies, candidates).
+    """
+    for strat_cls in strategies:
+        if payoff_sensitive(strat_cls) and any(
+            reads_outcomes_on_import(module_name) for module_name in _strategy_modules(strat_cls)
+        ):
+            raise RuntimeError(
+                f"{strat_cls.name} reads OUTCOMES as its module is imported, "
+                "so it can't follow the outcomes being swept!"
+            )
+    pairs = list(combinations(range(len(strategies)), 2))
+    # simulate every match once
+    shares = np.array([tally(strategies[i], strategies[j]) for i, j in pairs])
+    # payoffs of the 1st and 2nd player, in the same order as the shares
+    payoffs1 = np.array([[p, t, s, r] for (p, t), (s, r) in candidates])
+    payoffs2 = np.array([[p, s, t, r] for (p, t), (s, r) in candidates])
+    scores1 = shares @ payoffs1.T
+    scores2 = shares @ payoffs2.T
+    # simulate the payoff-sensitive matches again, for each of the candidates
+    for n, (i, j) in enumerate(pairs):
+        if not (payoff_sensitive(strategies[i]) or payoff_sensitive(strategies[j])):
+            continue
+        for k, outcomes in enumerate(candidates):
+            with outcomes_set_to(outcomes, strategies[i], strategies[j]):
+                pair_shares = np.array(tally(strategies[i], strategies[j]))
+            scores1[n, k] = pair_shares @ payoffs1[k]
+            scores2[n, k] = pair_shares @ payoffs2[k]
+    # total up each strategy's score
+    totals = np.zeros((len(strategies), len(candidates)))
+    first, second = np.array(pairs).T
+    np.add.at(totals, first, scores1)
+    np.add.at(totals, second, scores2)
+    return totals / (len(strategies) - 1)
+
+
+if __name__ == "__main__":
+    if not with_stochastic:
+        strategies = [s for s in strategies if not s.stochastic]
+    candidates = random_outcomes(np.random.default_rng(seed), matrices)
+    averages = sweep(strategies, candidates)
+    # rank the strategies for each of the candidates, 1 being the best
+    ranks = np.empty_like(averages, dtype=int)
+    ranks[np.argsort(-averages, axis=0), np.arange(len(candidates))] = np.arange(
+        1, len(strategies) + 1
+    )[:, None]
+    mean_ranks = ranks.mean(axis=1)
+    with open("sweep.txt", "w", encoding="utf8") as file:
+        file.write(f"Round length: {ROUND_LEN}\n")
+        file.write(f"Seed: {SEED}\n")
+        file.write(f"Payoff matrices: {len(candidates)}\n")
+        sensitive = [s.name for s in strategies if payoff_sensitive(s)]
+        file.write(f"Payoff-sensitive strategies: {', '.join(sensitive) or 'none'}\n\n\n")
+        file.write("MEAN RANKS\n")
+        nw = floor(log10(len(strategies))) + 1
+        nl = max(len(s.name) for s in strategies) + 1
+        for i, n in enumerate(np.argsort(mean_ranks, kind="stable"), start=1):
+            file.write(
+                f"#{i:{nw}} {f'{strategies[n].name}:':{nl}} {mean_ranks[n]:.3f}"
+                f" (best: {ranks[n].min()}, worst: {ranks[n].max()},"
+                f" won {(ranks[n] == 1).mean():.1%} of matrices,"
+                f" mean score: {averages[n].mean()})\n"
+            )
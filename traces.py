@@ -0,0 +1,231 @@
+"""
+A compact, binary store of the moves and scores of every match, that can be queried afterwards.
+
+Every match is stored as a fixed-size record header (its pair, repetition, number of rounds
+and both scores), followed by its moves, packed at 2 bits per round: `move1 << 1 | move2`,
+four rounds to a byte, first round in the highest bits. Matches are appended as they're played,
+and an index is written at the end: the offset of every match, and the first match
+and the number of matches of every pair. Opened via memory mapping, the moves and scores
+of any pair or match can be looked up in constant time, without reading the rest of the file.
+
+Like in `results.txt`, only the first repetition of every pair has its moves stored,
+while the scores of every repetition are.
+"""
+import os
+import json
+import mmap
+import struct
+from array import array
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+from history import History
+from constants import LETTERS
+from engine import MatchResult
+
+
+MAGIC = b"PDTRACES"
+# bumped whenever the format of the file changes
+TRACE_VERSION = 1
+
+# pair index, repetition, number of rounds stored, score1, score2
+_RECORD = struct.Struct("<QIIdd")
+# magic, version, round length, seed, number of pairs, and the offsets of the strategy names,
+# the match offsets and the pair table
+_TRAILER = struct.Struct("<8sIIQQQQQ")
+# first match and number of matches of a pair
+_PAIR = struct.Struct("<QI")
+_OFFSET = struct.Struct("<Q")
+
+# the four rounds packed into every possible byte
+_UNPACK = [bytes(byte >> shift & 3 for shift in (6, 4, 2, 0)) for byte in range(256)]
+
+
+def pair_index(count: int, first: int, second: int) -> int:
+    """
+    Returns the index of the pair of the strategies at the given positions,
+    among `combinations(strategies, 2)` of `count` strategies, with `first < second`.
+    """
+    return first * (2 * count - first - 1) // 2 + second - first - 1
+
+
+def pack(moves1: str, moves2: str) -> bytes:
+    """
+    Packs the rendered moves of both strategies at 2 bits per round.
+    """
+    packed = bytearray((len(moves1) + 3) // 4)
+    move = LETTERS.index
+    for i, (letter1, letter2) in enumerate(zip(moves1, moves2)):
+        packed[i >> 2] |= (move(letter1) << 1 | move(letter2)) << (6 - 2 * (i & 3))
+    return bytes(packed)
+
+
+class TraceWriter:
+    """
+    Appends the matches of every pair to the trace file, writing the index once it's closed.
+
+    `resume_offset` continues a file that's been interrupted, keeping only the matches
+    written before the given offset - see `TraceWriter.tell`.
+    """
+    def __init__(
+        self,
+        path: str,
+        round_len: int,
+        seed: int,
+        names: List[str],
+        pairs: int,
+        resume_offset: Optional[int] = None,
+    ):
+        self._round_len = round_len
+        self._seed = seed
+        self._names = names
+        self._offsets = array('Q')
+        self._pair_first = array('Q', bytes(8 * pairs))
+        self._pair_count = array('I', bytes(4 * pairs))
+        self._file: BinaryIO
+        if resume_offset is None:
+            self._file = open(path, "wb")
+            self._file.write(MAGIC)
+            return
+        self._file = open(path, "r+b")
+        self._file.truncate(resume_offset)
+        # find the matches written so far
+        offset = len(MAGIC)
+        while offset < resume_offset:
+            self._file.seek(offset)
+            pair, _, rounds, _, _ = _RECORD.unpack(self._file.read(_RECORD.size))
+            self._index(pair, offset)
+            offset += _RECORD.size + (rounds + 3) // 4
+        self._file.seek(resume_offset)
+
+    def _index(self, pair: int, offset: int) -> None:
+        if not self._pair_count[pair]:
+            self._pair_first[pair] = len(self._offsets)
+        self._pair_count[pair] += 1
+        self._offsets.append(offset)
+
+    def add(self, pair: int, pair_results: List[MatchResult]) -> None:
+        """
+        Appends the results of all matches of the given pair, in order.
+        """
+        for repetition, result in enumerate(pair_results):
+            self._index(pair, self._file.tell())
+            moves = pack(result.moves1, result.moves2)
+            self._file.write(_RECORD.pack(
+                pair, repetition, len(result.moves1), result.score1, result.score2
+            ))
+            self._file.write(moves)
+
+    def tell(self) -> int:
+        """
+        Returns the offset to resume the file from, making sure everything before it
+        has been written to the disk.
+        """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    def close(self) -> None:
+        """
+        Writes the index, and closes the file.
+        """
+        file = self._file
+        names_offset = file.tell()
+        file.write(json.dumps(self._names).encode("utf8"))
+        offsets_offset = file.tell()
+        file.write(self._offsets.tobytes())
+        pairs_offset = file.tell()
+        for first, count in zip(self._pair_first, self._pair_count):
+            file.write(_PAIR.pack(first, count))
+        file.write(_TRAILER.pack(
+            MAGIC,
+            TRACE_VERSION,
+            self._round_len,
+            self._seed,
+            len(self._pair_count),
+            names_offset,
+            offsets_offset,
+            pairs_offset,
+        ))
+        file.close()
+
+
+class TraceReader:
+    """
+    Reads the trace file written by `TraceWriter`, via memory mapping.
+
+    Pairs are identified by their index, the position among `combinations(strategies, 2)`
+    - see `TraceReader.pair` to find it by the strategy names.
+    """
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic,
+            version,
+            self.round_len,
+            self.seed,
+            self.pairs,
+            names_offset,
+            self._offsets_offset,
+            self._pairs_offset,
+        ) = _TRAILER.unpack_from(self._data, len(self._data) - _TRAILER.size)
+        if magic != MAGIC or version != TRACE_VERSION:
+            raise RuntimeError(f"{path} isn't a trace file of this version")
+        self.names: List[str] = json.loads(self._data[names_offset:self._offsets_offset])
+        self._positions: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+
+    def close(self) -> None:
+        self._data.close()
+
+    def __enter__(self) -> "TraceReader":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def pair(self, name1: str, name2: str) -> int:
+        """
+        Returns the index of the pair of the given strategies, in the order they played in.
+        """
+        first, second = self._positions[name1], self._positions[name2]
+        if first >= second:
+            raise KeyError(f"{name1} didn't play {name2} as the first strategy")
+        return pair_index(len(self.names), first, second)
+
+    def repetitions(self, pair: int) -> int:
+        """
+        Returns the number of matches stored for the given pair.
+        """
+        return _PAIR.unpack_from(self._data, self._pairs_offset + pair * _PAIR.size)[1]
+
+    def _record(self, pair: int, repetition: int) -> Tuple[int, int, float, float]:
+        first, count = _PAIR.unpack_from(self._data, self._pairs_offset + pair * _PAIR.size)
+        if not 0 <= repetition < count:
+            raise IndexError(f"Pair {pair} doesn't have a repetition {repetition} stored")
+        (offset,) = _OFFSET.unpack_from(
+            self._data, self._offsets_offset + (first + repetition) * _OFFSET.size
+        )
+        _, _, rounds, score1, score2 = _RECORD.unpack_from(self._data, offset)
+        return offset + _RECORD.size, rounds, score1, score2
+
+    def scores(self, pair: int, repetition: int = 0) -> Tuple[float, float]:
+        """
+        Returns the total scores of both strategies in the given match.
+        """
+        _, _, score1, score2 = self._record(pair, repetition)
+        return score1, score2
+
+    def history(self, pair: int, repetition: int = 0) -> History:
+        """
+        Returns the history of the given match, as seen by the first strategy.
+        It's empty for the matches that didn't have their moves stored.
+        """
+        offset, rounds, _, _ = self._record(pair, repetition)
+        packed = self._data[offset:offset + (rounds + 3) // 4]
+        return History(bytearray(b''.join(map(_UNPACK.__getitem__, packed))[:rounds]))
+
+    def moves(self, pair: int, repetition: int = 0) -> Tuple[str, str]:
+        """
+        Returns the moves of both strategies in the given match, rendered like in `results.txt`.
+        """
+        return self.history(pair, repetition).render(LETTERS)